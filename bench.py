@@ -0,0 +1,278 @@
+"""
+AC Web Conductor 성능 측정 스크립트
+
+사용법:
+    python bench.py numeric --rows 1000000
+    python bench.py rules --rows 5000000 --days 30
+    python bench.py export --rows 200000
+    python bench.py pipeline --rows 100000 --layout 12 --header
+    python bench.py load --accounts 8 --days 7 --rate 5
+
+pipeline/load는 mock_naver의 로컬 API 대역을 띄워 실제 HTTP 경로(서명, 폴링, 429 재시도, 스트리밍)를 그대로 거칩니다.
+"""
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+import numpy as np
+import pandas as pd
+
+import naver_api
+import report_store
+from mock_naver import MockNaverServer, LAYOUTS
+from perf import clear_events, summarize_events
+from utils import coerce_numeric, export_frames, analyze_zombie_products
+from zombie_rules import evaluate_rules, DEFAULT_ZOMBIE_RULES
+
+METRIC_COLS = ['노출수', '클릭수', '광고비(원)', '전환매출액(원)']
+
+# --------------------------------------------------------------------------
+# [Data] 합성 데이터 생성
+# --------------------------------------------------------------------------
+def make_metric_frame(rows, seed=0, as_text=True):
+    """업로드 파일처럼 쉼표/공백이 섞인 문자열 지표 컬럼을 만듭니다."""
+    rng = np.random.default_rng(seed)
+    data = {
+        '노출수': rng.integers(0, 50000, rows),
+        '클릭수': rng.integers(0, 500, rows),
+        '광고비(원)': rng.integers(0, 2000000, rows),
+        '전환매출액(원)': rng.integers(0, 5000000, rows),
+    }
+    df = pd.DataFrame(data)
+    if as_text:
+        for c in ['광고비(원)', '전환매출액(원)']:
+            df[c] = df[c].map('{:,}'.format)
+        df['노출수'] = df['노출수'].astype(str) + ' '
+        df['클릭수'] = df['클릭수'].astype(str)
+    return df
+
+# --------------------------------------------------------------------------
+# [Util] 측정 도구
+# --------------------------------------------------------------------------
+def measure_peak(fn):
+    """
+    실행 시간(초), 파이썬 힙 최대 사용량(MB), 결과를 반환합니다.
+    tracemalloc 오버헤드가 시간에 섞이지 않도록 시간과 메모리는 따로 측정합니다.
+    """
+    t = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return seconds, peak, result
+
+def measure(fn, repeat=3):
+    """가장 빠른 실행 시간(초)과 마지막 결과를 반환합니다."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t)
+    return best, result
+
+def report(name, rows, seconds, extra=""):
+    print(f"{name:<32} {seconds * 1000:>10.1f} ms {rows / seconds:>14,.0f} rows/s  {extra}")
+
+# --------------------------------------------------------------------------
+# [Stage] 숫자 정제 (analyze_zombie_products Step E)
+# --------------------------------------------------------------------------
+def legacy_coerce(df, cols):
+    for c in cols:
+        df[c] = df[c].astype(str).str.replace(',', '').str.replace(' ', '')
+        df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+    return df
+
+def bench_numeric(args):
+    print(f"[numeric] rows={args.rows:,}")
+    for label, as_text in [("text", True), ("numeric", False)]:
+        src = make_metric_frame(args.rows, as_text=as_text)
+        t_old, old = measure(lambda: legacy_coerce(src.copy(), METRIC_COLS), args.repeat)
+        t_new, new = measure(lambda: coerce_numeric(src.copy(), METRIC_COLS), args.repeat)
+        assert (old[METRIC_COLS].to_numpy() == new[METRIC_COLS].to_numpy()).all()
+        mem_old = old[METRIC_COLS].memory_usage(index=False).sum() / 1e6
+        mem_new = new[METRIC_COLS].memory_usage(index=False).sum() / 1e6
+        report(f"legacy ({label} input)", args.rows, t_old, f"{mem_old:.1f} MB")
+        report(f"coerce_numeric ({label} input)", args.rows, t_new, f"{mem_new:.1f} MB  x{t_old / t_new:.1f}")
+
+# --------------------------------------------------------------------------
+# [Stage] 좀비 규칙 평가
+# --------------------------------------------------------------------------
+BENCH_RULES = DEFAULT_ZOMBIE_RULES + [
+    {"name": "7일 누적 무매출", "window_days": 7, "when": {"cost": [">=", 30000], "sales": ["==", 0]}},
+    {"name": "7일 저ROAS", "window_days": 7, "when": {"cost": [">=", 30000], "roas": ["<", 100]}},
+    {"name": "저CTR", "when": {"imp": [">=", 1000], "ctr": ["<", 0.1]}, "overrides": {"cmp-1": {"ctr": ["<", 0.05]}}},
+    {"name": "고CPC", "when": {"cpc": [">=", 3000], "sales": ["==", 0]}},
+]
+
+def bench_rules(args):
+    df = make_metric_frame(args.rows, as_text=False)
+    rng = np.random.default_rng(1)
+    df['날짜'] = (pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, args.days, args.rows), unit='D')).strftime('%Y%m%d')
+    df['키워드ID'] = pd.Categorical(rng.integers(0, max(1, args.rows // args.days), args.rows).astype(str))
+    df['캠페인ID'] = pd.Categorical('cmp-' + pd.Series(rng.integers(0, 50, args.rows)).astype(str))
+    cols = {'cost': '광고비(원)', 'sales': '전환매출액(원)', 'imp': '노출수', 'clk': '클릭수'}
+    print(f"[rules] rows={args.rows:,} days={args.days} rules={len(BENCH_RULES)}")
+
+    t_legacy, _ = measure(lambda: ((df[cols['cost']] >= 5000) & (df[cols['sales']] == 0)) |
+                                  ((df[cols['imp']] >= 100) & (df[cols['clk']] == 0)), args.repeat)
+    report("legacy (2 fixed rules)", args.rows, t_legacy)
+    t_default, _ = measure(lambda: evaluate_rules(df, cols), args.repeat)
+    report("engine (default rules)", args.rows, t_default)
+    t_all, labels = measure(lambda: evaluate_rules(df, cols, BENCH_RULES, '날짜', '키워드ID', '캠페인ID'), args.repeat)
+    report(f"engine ({len(BENCH_RULES)} rules, windows)", args.rows, t_all, f"matched={labels.notna().sum():,}")
+
+# --------------------------------------------------------------------------
+# [Stage] 다운로드 파일 생성
+# --------------------------------------------------------------------------
+def make_report_frame(rows, seed=0):
+    """14열 표준 리포트 형태의 DataFrame"""
+    rng = np.random.default_rng(seed)
+    df = make_metric_frame(rows, seed, as_text=False)
+    df.insert(0, '날짜', '2024-01-01')
+    df.insert(1, '캠페인ID', pd.Categorical('cmp-' + pd.Series(rng.integers(0, 50, rows)).astype(str)))
+    df.insert(2, '키워드ID', 'nkw-' + pd.Series(rng.integers(0, rows, rows)).astype(str))
+    df.insert(3, '키워드명', '키워드' + pd.Series(rng.integers(0, rows, rows)).astype(str))
+    return df
+
+def legacy_export(df):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False)
+    return output.getvalue()
+
+def bench_export(args):
+    df = make_report_frame(args.rows)
+    print(f"[export] rows={args.rows:,} cols={df.shape[1]}")
+    cases = [("legacy ExcelWriter (BytesIO)", lambda: legacy_export(df))]
+    cases += [(f"export_frames {fmt}", lambda fmt=fmt: export_frames({"Report": df}, fmt)) for fmt in ["xlsx", "csv", "parquet"]]
+    for name, fn in cases:
+        seconds, peak, data = measure_peak(fn)
+        report(name, args.rows, seconds, f"size={len(data) / 1e6:.1f} MB peak={peak:.0f} MB")
+
+# --------------------------------------------------------------------------
+# [Stage] 리포트 파이프라인 (생성/대기 → 다운로드 → 파싱 → 분석 → 내보내기)
+# --------------------------------------------------------------------------
+@contextmanager
+def temp_store():
+    # 벤치마크가 받은 리포트는 임시 저장소에만 쓰고 끝나면 지움 (실제 report_store/에 섞이지 않도록)
+    original = report_store.STORE_DIR
+    report_store.STORE_DIR = tempfile.mkdtemp(prefix="ac-bench-store-")
+    try:
+        yield report_store.STORE_DIR
+    finally:
+        shutil.rmtree(report_store.STORE_DIR, ignore_errors=True)
+        report_store.STORE_DIR = original
+
+def bench_pipeline(args):
+    # analyze_zombie_products의 화면 출력은 Streamlit 실행 환경 밖에서 경고만 남기므로 숨김
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    with temp_store(), MockNaverServer(rows=args.rows, layout=args.layout, header=args.header, build_delay=args.build_delay) as mock:
+        acc = mock.add_account("bench")
+        client = naver_api.NaverClient(acc, base_url=mock.url, min_interval=0)
+        job_key = (acc['id'], "AD", "2024-01-01")
+        print(f"[pipeline] rows={args.rows:,} layout={args.layout}{' +header' if args.header else ''} build_delay={args.build_delay}s api={mock.url}")
+
+        def create_and_wait():
+            naver_api.remember_report_job(job_key, None)
+            jid = naver_api.create_report_job(client, job_key)
+            return naver_api.wait_for_report(client, jid, deadline=args.build_delay + 60, first_interval=0.1)
+        seconds, peak, durl = measure_peak(create_and_wait)
+        report("create + wait (BUILT)", args.rows, seconds, f"peak={peak:.0f} MB")
+
+        seconds, peak, fp = measure_peak(lambda: naver_api.fetch_report_file(client, durl))
+        size = fp.seek(0, 2)
+        report("download (stream → spool)", args.rows, seconds, f"{size / 1e6 / seconds:.0f} MB/s size={size / 1e6:.1f} MB peak={peak:.0f} MB")
+
+        def parse():
+            fp.seek(0)
+            return naver_api.parse_report_tsv(fp)
+        seconds, peak, df = measure_peak(parse)
+        fp.close()
+        report("parse_report_tsv", args.rows, seconds, f"mem={df.memory_usage(deep=True).sum() / 1e6:.0f} MB peak={peak:.0f} MB")
+
+        seconds, peak, zombies = measure_peak(lambda: analyze_zombie_products(df.copy(), BENCH_RULES))
+        report("analyze_zombie_products", args.rows, seconds, f"zombies={len(zombies):,} peak={peak:.0f} MB")
+
+        for fmt in ["xlsx", "csv", "parquet"]:
+            seconds, peak, data = measure_peak(lambda: export_frames({"Report": df}, fmt))
+            report(f"export_frames {fmt}", args.rows, seconds, f"size={len(data) / 1e6:.1f} MB peak={peak:.0f} MB")
+
+        seconds, peak, _ = measure_peak(lambda: naver_api.download_naver_report(acc, client=client, use_cache=False, stat_dt="2024-01-02"))
+        report("download_naver_report (end-to-end)", args.rows, seconds, f"peak={peak:.0f} MB")
+        print(f"mock: {mock.stats}")
+
+# --------------------------------------------------------------------------
+# [Stage] 부하 테스트 (여러 계정 × 여러 날짜 백필, 요청 한도/재시도 포함)
+# --------------------------------------------------------------------------
+def bench_load(args):
+    start, end = "2024-01-01", (pd.Timestamp("2024-01-01") + pd.Timedelta(days=args.days - 1)).strftime("%Y-%m-%d")
+    with MockNaverServer(rows=args.rows, build_delay=args.build_delay, rate=args.rate, burst=args.burst) as mock:
+        naver_api.NAVER_API_BASE = mock.url
+        accounts = {f"bench-{i}": mock.add_account() for i in range(args.accounts)}
+        print(f"[load] accounts={args.accounts} days={args.days} rows/report={args.rows:,} workers={args.workers} "
+              f"rate={args.rate}/s burst={args.burst} build_delay={args.build_delay}s")
+
+        def backfill():
+            # 매 실행마다 빈 저장소에서 시작 (이미 받은 날짜를 건너뛰지 않도록)
+            with temp_store():
+                clear_events()
+                results = list(naver_api.backfill_naver_reports(accounts, start, end, max_workers=args.workers))
+                return results, summarize_events()
+
+        seconds, peak, (results, summary) = measure_peak(backfill)
+        done = [r for r in results if not isinstance(r[2], Exception)]
+        rows = sum(len(r[2]) for r in done)
+        report(f"backfill {args.accounts}x{args.days}", max(rows, 1), seconds,
+               f"reports={len(done)}/{len(results)} ({len(done) / seconds:.1f}/s) peak={peak:.0f} MB")
+        for alias, day, err in [r for r in results if isinstance(r[2], Exception)][:5]:
+            print(f"  failed {alias} {day}: {err}")
+        print(f"mock: {mock.stats}")
+        print(summary.to_string())
+
+def main():
+    parser = argparse.ArgumentParser(description="AC Web Conductor benchmark")
+    sub = parser.add_subparsers(dest="stage", required=True)
+
+    p = sub.add_parser("numeric", help="지표 컬럼 숫자 정제")
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_numeric)
+
+    p = sub.add_parser("rules", help="좀비 규칙 평가")
+    p.add_argument("--rows", type=int, default=5_000_000)
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_rules)
+
+    p = sub.add_parser("export", help="다운로드 파일 생성 (xlsx/csv/parquet)")
+    p.add_argument("--rows", type=int, default=200_000)
+    p.set_defaults(func=bench_export)
+
+    p = sub.add_parser("pipeline", help="리포트 파이프라인 단계별 측정 (로컬 API 대역)")
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--layout", choices=sorted(LAYOUTS), default="14")
+    p.add_argument("--header", action="store_true", help="첫 줄에 컬럼명 포함")
+    p.add_argument("--build-delay", type=float, default=1.0)
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("load", help="여러 계정 동시 백필 부하 테스트 (로컬 API 대역)")
+    p.add_argument("--accounts", type=int, default=8)
+    p.add_argument("--days", type=int, default=7)
+    p.add_argument("--rows", type=int, default=20_000)
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--rate", type=float, default=5.0, help="계정별 초당 요청 한도")
+    p.add_argument("--burst", type=int, default=5)
+    p.add_argument("--build-delay", type=float, default=1.0)
+    p.set_defaults(func=bench_load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
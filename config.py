@@ -1,18 +1,147 @@
 import json
 import os
+import copy
+import time
+import threading
+from contextlib import contextmanager
+from zombie_rules import DEFAULT_ZOMBIE_RULES
 
+# --------------------------------------------------------------------------
+# [Config] 설정 저장소 (config.json)
+# - 읽기: 파일의 (inode, mtime, 크기)가 바뀐 경우에만 다시 읽고, 프로세스 안의 모든 세션이 공유
+# - 쓰기: 잠금 파일(O_EXCL)로 한 번에 하나만 → 최신 파일에 변경분만 적용 → 임시 파일에 쓴 뒤 교체
+# - 파일이 깨져 있으면 기본값으로 대체하지 않고 예외를 올림 (덮어써서 계정이 사라지는 일 방지)
+# --------------------------------------------------------------------------
 CONFIG_FILE = "config.json"
-DEFAULT_CONFIG = {"GOOGLE_API_KEY": "", "NAVER_ACCOUNTS": {}}
+DEFAULT_CONFIG = {"GOOGLE_API_KEY": "", "NAVER_ACCOUNTS": {}, "ZOMBIE_RULES": DEFAULT_ZOMBIE_RULES}
+LOCK_TIMEOUT = 10           # 잠금 대기 최대 시간(초)
+LOCK_STALE_SECONDS = 30     # 이보다 오래된 잠금 파일은 비정상 종료로 남은 것으로 보고 제거
+
+_cache = {"key": None, "data": None}
+_cache_lock = threading.Lock()
+
+def default_config():
+    return copy.deepcopy(DEFAULT_CONFIG)
+
+@contextmanager
+def config_lock(timeout=LOCK_TIMEOUT):
+    """프로세스/세션 공용 쓰기 잠금 (운영체제와 무관하게 동작하는 잠금 파일 방식)"""
+    lock_path = f"{CONFIG_FILE}.lock"
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            break
+        except FileExistsError:
+            try:
+                if _remove_stale_lock(lock_path): continue
+            except OSError:
+                continue
+            if time.time() > deadline: raise Exception("설정 파일 잠금 대기 시간 초과")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try: os.remove(lock_path)
+        except OSError: pass
+
+def _remove_stale_lock(lock_path):
+    """오래된 잠금 파일을 지웁니다. 다른 프로세스가 방금 새로 만든 잠금은 지우지 않습니다.
+    - 고유한 이름으로 옮긴 뒤(rename은 원자적) 옮긴 파일이 오래됐다고 판단한 그 파일인지 확인하고 삭제"""
+    stat = os.stat(lock_path)
+    if time.time() - stat.st_mtime <= LOCK_STALE_SECONDS: return False
+    stale_path = f"{lock_path}.{os.getpid()}.{threading.get_ident()}.stale"
+    os.rename(lock_path, stale_path)
+    moved = os.stat(stale_path)
+    if (moved.st_ino, moved.st_mtime_ns) != (stat.st_ino, stat.st_mtime_ns):
+        # 그 사이 다른 프로세스가 새 잠금을 잡았음 → 되돌려 놓음 (이미 다른 잠금이 있으면 그 잠금이 유효)
+        try: os.link(stale_path, lock_path)
+        except OSError: pass
+    os.remove(stale_path)
+    return True
+
+def _file_key():
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _read_config():
+    """캐시된 설정을 반환합니다. 파일이 바뀌었을 때만 디스크에서 다시 읽습니다. (반환값은 수정 금지)"""
+    key = _file_key()
+    if key is None: return DEFAULT_CONFIG
+    with _cache_lock:
+        if _cache["key"] == key: return _cache["data"]
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f: data = json.load(f)
+        if not isinstance(data, dict): raise ValueError("최상위 값이 객체가 아닙니다.")
+    except (OSError, ValueError) as e:
+        raise Exception(f"설정 파일({CONFIG_FILE})을 읽을 수 없습니다: {e}")
+    data = {**default_config(), **data}
+    with _cache_lock:
+        _cache["key"], _cache["data"] = key, data
+    return data
+
+def _write_config(data):
+    # 잠금을 잡은 상태에서만 호출
+    tmp = f"{CONFIG_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, CONFIG_FILE)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    with _cache_lock:
+        _cache["key"], _cache["data"] = _file_key(), data
 
 def load_config():
-    if not os.path.exists(CONFIG_FILE): return DEFAULT_CONFIG
+    """설정 사본을 반환합니다. (파일이 깨져 있으면 예외)"""
+    return copy.deepcopy(_read_config())
+
+def update_config(mutate):
+    """
+    잠금을 잡고 최신 설정에 mutate(config)를 적용해 저장합니다.
+    다른 세션이 그사이 바꾼 항목은 그대로 유지됩니다. 저장된 설정 사본을 반환합니다.
+    """
+    with config_lock():
+        data = copy.deepcopy(_read_config())
+        mutate(data)
+        _write_config(data)
+    return copy.deepcopy(data)
+
+def set_config_value(key, value):
+    def apply(c): c[key] = value
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f: return json.load(f)
-    except: return DEFAULT_CONFIG
+        update_config(apply)
+        return True
+    except Exception: return False
+
+def upsert_account(alias, account):
+    """네이버 계정 하나를 추가/수정합니다. (다른 계정은 건드리지 않음)"""
+    def apply(c): c.setdefault("NAVER_ACCOUNTS", {})[alias] = account
+    try:
+        update_config(apply)
+        return True
+    except Exception: return False
+
+def delete_account(alias):
+    def apply(c): c.setdefault("NAVER_ACCOUNTS", {}).pop(alias, None)
+    try:
+        update_config(apply)
+        return True
+    except Exception: return False
 
 def save_config(data):
+    """설정 전체를 덮어씁니다. (계정 단위 변경은 upsert_account / delete_account 사용)"""
+    def apply(c):
+        c.clear()
+        c.update(copy.deepcopy(data))
     try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        update_config(apply)
         return True
-    except: return False
\ No newline at end of file
+    except Exception: return False
@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from perf import timed
+
+# --------------------------------------------------------------------------
+# [Jobs] 백그라운드 작업 큐
+# 작업 상태는 SQLite(jobs 테이블)에 기록되고 프로세스 공용 스레드 풀에서 실행됩니다.
+# 풀은 대기/실행 중인 작업 수만큼 늘어나므로(최대 JOB_MAX_WORKERS) 계정별 작업이 차례를 기다리지 않습니다.
+# Streamlit 재실행/새로고침/다른 세션과 무관하게 작업이 이어지며, UI는 상태만 조회합니다.
+# 작업은 'queued'→'running' 조건부 UPDATE로 한 곳에서만 가져가고(중복 실행 방지),
+# 실행 중인 작업은 주기적으로 heartbeat를 남깁니다. heartbeat가 끊긴 작업만 종료된 프로세스의 것으로 보고 다시 실행합니다.
+# --------------------------------------------------------------------------
+JOB_DB = os.environ.get("AC_JOB_DB", "jobs.sqlite3")
+JOB_MIN_WORKERS = 4
+JOB_MAX_WORKERS = int(os.environ.get("AC_JOB_MAX_WORKERS", "64"))
+ACTIVE_STATUS = ("queued", "running")
+HEARTBEAT_SECONDS = 10
+STALE_SECONDS = 60          # heartbeat가 이보다 오래 없으면 실행하던 프로세스가 죽은 것으로 봄
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+_handlers = {}
+_executor = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+
+@contextmanager
+def _connect(db=None):
+    conn = sqlite3.connect(db or JOB_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn: yield conn
+    finally:
+        conn.close()
+
+def init_job_db():
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                label TEXT,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                heartbeat REAL
+            )
+        """)
+        # 이전 버전 DB에는 owner/heartbeat 컬럼이 없음
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+            if column not in columns: conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+def _update(job_id, **fields):
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", [*fields.values(), job_id])
+
+def _row_to_job(row):
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def job_handler(kind):
+    """
+    작업 종류별 실행 함수 등록: handler(params, progress) -> JSON으로 저장 가능한 결과
+    progress(text, **state): 진행 문구를 기록하고, state는 params에 합쳐 저장합니다.
+    (재시작 후 다시 실행될 때 handler가 이어서 진행할 수 있도록 중간 상태를 남기는 용도)
+    """
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+def _active_count():
+    with _connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUS).fetchone()[0]
+
+def _get_executor():
+    global _executor, _executor_size
+    with _executor_lock:
+        if _executor is None:
+            init_job_db()
+            _executor_size = min(max(JOB_MIN_WORKERS, _active_count()), JOB_MAX_WORKERS)
+            _executor = ThreadPoolExecutor(max_workers=_executor_size, thread_name_prefix="ac-job")
+            for job_id in _recover_jobs(): _executor.submit(_run_job, job_id)
+            threading.Thread(target=_heartbeat_loop, args=(JOB_DB,), name="ac-job-heartbeat", daemon=True).start()
+        return _executor
+
+def _schedule(job_id):
+    """
+    작업을 풀에 넣습니다. 대기/실행 중인 작업 수가 풀 크기를 넘으면 두 배 이상 큰 풀로 교체합니다.
+    (기존 풀은 맡은 작업만 마치고 정리됨)
+    """
+    global _executor, _executor_size
+    _get_executor()
+    with _executor_lock:
+        active = _active_count()
+        if active > _executor_size and _executor_size < JOB_MAX_WORKERS:
+            _executor.shutdown(wait=False)
+            _executor_size = min(max(active, _executor_size * 2), JOB_MAX_WORKERS)
+            _executor = ThreadPoolExecutor(max_workers=_executor_size, thread_name_prefix="ac-job")
+        _executor.submit(_run_job, job_id)
+
+def _requeue_stale(db=None):
+    """heartbeat가 끊긴 'running' 작업(종료된 프로세스가 잡고 있던 것)을 대기 상태로 되돌리고 ID를 반환합니다."""
+    cutoff = time.time() - STALE_SECONDS
+    with _connect(db) as conn:
+        ids = [r["id"] for r in conn.execute(
+            "SELECT id FROM jobs WHERE status = 'running' AND COALESCE(heartbeat, started_at, 0) < ?", (cutoff,))]
+        for job_id in ids:
+            conn.execute("UPDATE jobs SET status = 'queued', progress = '재시작 후 대기 중' "
+                         "WHERE id = ? AND status = 'running' AND COALESCE(heartbeat, started_at, 0) < ?", (job_id, cutoff))
+    return ids
+
+def _recover_jobs():
+    # 이전 프로세스가 끝내지 못한 작업은 다시 실행 (다른 프로세스가 실행 중인 작업은 heartbeat가 살아 있으므로 제외)
+    # (리포트 작업은 params에 남긴 reportJobId를 이어받고, 이미 저장된 날짜는 저장소에서 읽으므로 중복 생성 없음)
+    _requeue_stale()
+    with _connect() as conn:
+        return [r["id"] for r in conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id")]
+
+def _heartbeat_loop(db):
+    # 이 프로세스가 실행 중인 작업의 heartbeat 갱신 + 죽은 프로세스가 남긴 작업 회수
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        if db != JOB_DB: return     # 작업 DB가 바뀌면(테스트 등) 이전 DB는 더 이상 관리하지 않음
+        try:
+            with _connect(db) as conn:
+                conn.execute("UPDATE jobs SET heartbeat = ? WHERE status = 'running' AND owner = ?", (time.time(), OWNER))
+            for job_id in _requeue_stale(db): _schedule(job_id)
+        except Exception:
+            pass
+
+def _run_job(job_id):
+    # 조건부 UPDATE로 작업을 가져감: 다른 스레드/프로세스가 먼저 가져갔으면 rowcount가 0
+    now = time.time()
+    with _connect() as conn:
+        claimed = conn.execute("UPDATE jobs SET status = 'running', started_at = ?, heartbeat = ?, owner = ? WHERE id = ? AND status = 'queued'",
+                               (now, now, OWNER, job_id)).rowcount
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone() if claimed else None
+    if row is None: return
+    job = _row_to_job(row)
+
+    state_lock = threading.Lock()
+    def progress(text=None, **state):
+        fields = {} if text is None else {"progress": str(text)}
+        with state_lock:
+            if state:
+                job["params"].update(state)
+                fields["params"] = json.dumps(job["params"], ensure_ascii=False)
+            if fields: _update(job_id, **fields)
+
+    try:
+        handler = _handlers.get(job["kind"])
+        if handler is None: raise Exception(f"알 수 없는 작업 종류: {job['kind']}")
+        with timed(f"job.{job['kind']}", job_id=job_id):
+            result = handler(job["params"], progress)
+        _update(job_id, status="done", result=json.dumps(result, ensure_ascii=False), finished_at=time.time())
+    except Exception as e:
+        _update(job_id, status="failed", error=str(e) or traceback.format_exc(limit=1), finished_at=time.time())
+
+def submit_job(kind, params, label=""):
+    """작업을 등록하고 곧바로 백그라운드에서 실행합니다. 작업 ID를 반환합니다."""
+    if kind not in _handlers: raise ValueError(f"알 수 없는 작업 종류: {kind}")
+    _get_executor()
+    with _connect() as conn:
+        cur = conn.execute(
+            "INSERT INTO jobs (kind, label, params, status, progress, created_at) VALUES (?, ?, ?, 'queued', '대기 중', ?)",
+            (kind, label, json.dumps(params, ensure_ascii=False), time.time()),
+        )
+        job_id = cur.lastrowid
+    _schedule(job_id)
+    return job_id
+
+def get_job(job_id):
+    _get_executor()
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+def list_jobs(limit=30, job_ids=None):
+    """최근 작업 목록 (job_ids를 주면 해당 작업만)"""
+    _get_executor()
+    with _connect() as conn:
+        if job_ids is not None:
+            if not job_ids: return []
+            marks = ",".join("?" * len(job_ids))
+            rows = conn.execute(f"SELECT * FROM jobs WHERE id IN ({marks}) ORDER BY id DESC", list(job_ids)).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    return [_row_to_job(r) for r in rows]
+
+def has_active_jobs(jobs):
+    return any(job["status"] in ACTIVE_STATUS for job in jobs)
+
+# --------------------------------------------------------------------------
+# [Handlers] 네이버 리포트 작업
+# 인증정보는 작업 테이블에 남기지 않고 실행 시점에 config에서 별칭으로 찾습니다.
+# --------------------------------------------------------------------------
+def _account_for(alias):
+    from config import load_config
+    account = load_config().get("NAVER_ACCOUNTS", {}).get(alias)
+    if account is None: raise Exception(f"등록되지 않은 계정: {alias}")
+    return account
+
+def _resume_report_jobs(account, report_jobs):
+    # 이전 실행이 params에 남긴 {statDt: reportJobId}를 이어받음 (살아 있는 작업인지는 create_report_job이 확인)
+    from naver_api import remember_report_job
+    for stat_dt, jid in report_jobs.items():
+        remember_report_job((account["id"], "AD", stat_dt), jid)
+
+@job_handler("naver_report")
+def run_naver_report(params, progress):
+    from naver_api import download_naver_report
+    account = _account_for(params["alias"])
+    _resume_report_jobs(account, params.get("report_jobs", {}))
+    progress("리포트 생성/대기 중")
+    df, stat_dt = download_naver_report(account, stat_dt=params.get("stat_dt"), use_cache=not params.get("refresh"),
+                                        on_job=lambda key, jid: progress(report_jobs={key[2]: jid}))
+    progress(f"{stat_dt} · {len(df):,}행 저장")
+    return {"customer_id": account["id"], "report_tp": "AD", "stat_dt": stat_dt, "rows": len(df)}
+
+@job_handler("naver_backfill")
+def run_naver_backfill(params, progress):
+    from naver_api import backfill_naver_reports
+    account = _account_for(params["alias"])
+    report_jobs = dict(params.get("report_jobs", {}))
+    _resume_report_jobs(account, report_jobs)
+    jobs_lock = threading.Lock()
+
+    def on_job(key, jid):
+        with jobs_lock:
+            report_jobs[key[2]] = jid
+            progress(report_jobs=dict(report_jobs))
+
+    saved, errors = [], {}
+    progress("누락일 확인 중")
+    for _, day, outcome in backfill_naver_reports({params["alias"]: account}, params["start"], params["end"],
+                                                  on_job=on_job, refresh=params.get("refresh", False)):
+        if isinstance(outcome, Exception): errors[day] = str(outcome)
+        else: saved.append(day)
+        text = f"저장 {len(saved)}일 / 실패 {len(errors)}일"
+        if errors:
+            last = max(errors)
+            text += f" · {last}: {errors[last]}"
+        progress(text)
+    return {"customer_id": account["id"], "saved": sorted(saved), "failed": sorted(errors), "errors": dict(sorted(errors.items()))}
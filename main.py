@@ -1,20 +1,28 @@
 import streamlit as st
+import os
+import json
+import time
 import datetime
-import google.generativeai as genai
-from io import BytesIO
+from collections import OrderedDict
 import pandas as pd
 
 # --------------------------------------------------------------------------
 # [Module Connection] 필수 모듈 로드
 # --------------------------------------------------------------------------
 try:
-    from config import load_config, save_config
+    from config import load_config, set_config_value, upsert_account, delete_account
 except ImportError:
     st.error("🚨 [System Critical] 'config.py' 파일이 누락되었습니다. 파일을 확인해주세요.")
     st.stop()
 
-from utils import read_uploaded_file, get_system_prompt, analyze_zombie_products, generate_kill_list_filename
-from naver_api import download_naver_report
+from utils import (log_event, read_uploaded_file, get_chat_model, build_chat_history, analyze_zombie_products, generate_kill_list_filename,
+                   file_digest, parse_uploaded_report, remember_result, EXPORT_FORMATS, export_frames, export_file_name)
+from jobs import submit_job, list_jobs, has_active_jobs
+from report_store import list_reports, load_report
+from trends import TREND_WINDOWS, sync_keyword_history, keyword_trends
+from portfolio import ACCOUNT_COL, load_portfolio_frame, portfolio_rollup
+from zombie_rules import DEFAULT_ZOMBIE_RULES, validate_rules
+from perf import timed, record, summarize_events, export_events, clear_events
 
 # ==========================================
 # [SYSTEM] 페이지 기본 설정
@@ -29,8 +37,12 @@ st.set_page_config(
 # ==========================================
 # [STATE] 세션 상태 초기화 (Session State)
 # ==========================================
-if 'master_config' not in st.session_state:
+# 설정은 매 실행마다 가져오되, 파일이 바뀌었을 때만 디스크에서 읽음 (다른 세션의 변경도 바로 반영)
+try:
     st.session_state.master_config = load_config()
+except Exception as e:
+    st.error(f"🚨 {e}\n계정 정보 보호를 위해 설정을 덮어쓰지 않습니다. config.json을 확인해주세요.")
+    st.stop()
 
 if 'chat_history' not in st.session_state: 
     st.session_state.chat_history = []
@@ -38,6 +50,23 @@ if 'chat_history' not in st.session_state:
 if 'current_role' not in st.session_state: 
     st.session_state.current_role = "AC김시율 (Director)"
 
+if 'exec_job_ids' not in st.session_state:
+    # 새로고침하면 세션이 새로 시작되므로 작업 ID는 주소(?jobs=1,2,3)에도 남겨 두고 복원
+    st.session_state.exec_job_ids = [int(x) for x in st.query_params.get("jobs", "").split(",") if x.isdigit()]
+
+def set_exec_job_ids(job_ids):
+    st.session_state.exec_job_ids = list(dict.fromkeys(job_ids))
+    if st.session_state.exec_job_ids:
+        st.query_params["jobs"] = ",".join(str(i) for i in st.session_state.exec_job_ids)
+    elif "jobs" in st.query_params:
+        del st.query_params["jobs"]
+
+if 'logs' not in st.session_state:
+    st.session_state.logs = []
+
+if 'zombie_results' not in st.session_state:
+    st.session_state.zombie_results = OrderedDict()
+
 # ==========================================
 # [UI] 사이드바: 통합 제어 센터
 # ==========================================
@@ -51,9 +80,11 @@ with st.sidebar:
         new_google_key = st.text_input("API Key 입력", value=current_google_key, type="password")
         
         if st.button("구글 키 저장"):
-            st.session_state.master_config["GOOGLE_API_KEY"] = new_google_key
-            save_config(st.session_state.master_config)
-            st.success("Brain 연결 완료")
+            if set_config_value("GOOGLE_API_KEY", new_google_key):
+                st.session_state.master_config["GOOGLE_API_KEY"] = new_google_key
+                st.success("Brain 연결 완료")
+            else:
+                st.error("설정 저장 실패 (잠시 후 다시 시도해주세요)")
 
     # 2. Naver Body 설정
     with st.expander("🏦 Body (Naver Ad Accounts)", expanded=False):
@@ -67,15 +98,11 @@ with st.sidebar:
             
             if st.form_submit_button("계정 추가"):
                 if input_alias and input_id and input_key:
-                    if "NAVER_ACCOUNTS" not in st.session_state.master_config:
-                        st.session_state.master_config["NAVER_ACCOUNTS"] = {}
-                    
-                    st.session_state.master_config["NAVER_ACCOUNTS"][input_alias] = {
-                        "id": input_id, "key": input_key, "secret": input_secret
-                    }
-                    save_config(st.session_state.master_config)
-                    st.success(f"[{input_alias}] 등록 완료")
-                    st.rerun()
+                    if upsert_account(input_alias, {"id": input_id, "key": input_key, "secret": input_secret}):
+                        st.success(f"[{input_alias}] 등록 완료")
+                        st.rerun()
+                    else:
+                        st.error("계정 저장 실패 (잠시 후 다시 시도해주세요)")
 
         # 계정 삭제 기능
         registered_accounts = st.session_state.master_config.get("NAVER_ACCOUNTS", {})
@@ -86,10 +113,49 @@ with st.sidebar:
             
             if target_to_delete != "선택 안함":
                 if st.button("🗑️ 영구 삭제"):
-                    del st.session_state.master_config["NAVER_ACCOUNTS"][target_to_delete]
-                    save_config(st.session_state.master_config)
-                    st.warning(f"[{target_to_delete}] 삭제되었습니다.")
-                    st.rerun()
+                    if delete_account(target_to_delete):
+                        st.warning(f"[{target_to_delete}] 삭제되었습니다.")
+                        st.rerun()
+                    else:
+                        st.error("계정 삭제 실패 (잠시 후 다시 시도해주세요)")
+
+    # 3. 좀비 판정 규칙 설정
+    with st.expander("🧪 좀비 판정 규칙 (Rules)", expanded=False):
+        st.caption("지표: cost, sales, imp, clk, ctr(%), cpc(원), roas(%) / 위에 있는 규칙이 우선합니다.")
+        current_rules = st.session_state.master_config.get("ZOMBIE_RULES", DEFAULT_ZOMBIE_RULES)
+        rules_text = st.text_area("규칙 (JSON)", value=json.dumps(current_rules, ensure_ascii=False, indent=2), height=250)
+        
+        col_save, col_reset = st.columns(2)
+        if col_save.button("규칙 저장"):
+            try:
+                new_rules = validate_rules(json.loads(rules_text))
+                if set_config_value("ZOMBIE_RULES", new_rules):
+                    st.session_state.master_config["ZOMBIE_RULES"] = new_rules
+                    st.success("규칙 저장 완료")
+                else:
+                    st.error("설정 저장 실패 (잠시 후 다시 시도해주세요)")
+            except (ValueError, TypeError) as e:
+                st.error(f"규칙 형식 오류: {e}")
+        if col_reset.button("기본값 복원"):
+            set_config_value("ZOMBIE_RULES", DEFAULT_ZOMBIE_RULES)
+            st.rerun()
+
+    # 4. 성능 패널
+    with st.expander("⏱️ 성능 (Performance)", expanded=False):
+        perf_summary = summarize_events()
+        if perf_summary.empty:
+            st.caption("아직 측정된 작업이 없습니다.")
+        else:
+            st.dataframe(perf_summary, width='stretch')
+            col_json, col_csv = st.columns(2)
+            col_json.download_button("JSON", data=lambda: export_events("json"), file_name="perf_log.json", mime="application/json", on_click="ignore")
+            col_csv.download_button("CSV", data=lambda: export_events("csv"), file_name="perf_log.csv", mime="text/csv", on_click="ignore")
+            if st.button("측정 기록 초기화"):
+                clear_events()
+                st.rerun()
+        if st.session_state.logs:
+            st.caption("최근 로그")
+            st.code("\n".join(reversed(st.session_state.logs[-20:])), language=None)
 
 # ==========================================
 # [UI] 메인 스테이지
@@ -98,7 +164,7 @@ st.title("🏯 AC Team: Web Conductor v3.0")
 st.caption("Status: 🟢 System Online | Full Logic Restored")
 
 # 탭 구성
-tab_chat, tab_exec, tab_anal = st.tabs(["💬 작전 회의실", "📊 실행실 (Naver API)", "💀 분석실 (X-Ray & Select)"])
+tab_chat, tab_exec, tab_anal, tab_port = st.tabs(["💬 작전 회의실", "📊 실행실 (Naver API)", "💀 분석실 (X-Ray & Select)", "🏢 포트폴리오 (전체 계정)"])
 
 # -------------------------------------------------------
 # [Tab 1] 작전 회의실 (Chat)
@@ -140,61 +206,152 @@ with tab_chat:
             with chat_container.chat_message("user"):
                 st.markdown(display_message)
 
-            # AI 응답 생성
+            # AI 응답 생성 (스트리밍: 첫 토큰부터 바로 표시)
             with chat_container.chat_message("assistant"):
-                with st.spinner(f"[{st.session_state.current_role}] 분석 중..."):
-                    try:
-                        genai.configure(api_key=st.session_state.master_config["GOOGLE_API_KEY"])
-                        system_instruction = get_system_prompt(st.session_state.current_role)
-                        model = genai.GenerativeModel('gemini-2.0-flash-exp', system_instruction=system_instruction)
-                        
-                        response = model.generate_content(full_prompt)
-                        st.markdown(response.text)
-                        
-                        # AI 메시지 기록
-                        st.session_state.chat_history.append({"role": "assistant", "content": response.text})
-                    except Exception as e:
-                        st.error(f"AI 통신 오류: {e}")
+                placeholder = st.empty()
+                placeholder.caption(f"[{st.session_state.current_role}] 분석 중...")
+                try:
+                    model = get_chat_model(st.session_state.master_config["GOOGLE_API_KEY"], st.session_state.current_role)
+                    # 방금 추가한 사용자 메시지는 send_message로 보내므로 기록에서 제외
+                    chat = model.start_chat(history=build_chat_history(st.session_state.chat_history[:-1]))
+                    
+                    response_text, started = "", time.perf_counter()
+                    with timed("gemini.total", role=st.session_state.current_role, prompt_chars=len(full_prompt)) as m:
+                        for i, chunk in enumerate(chat.send_message(full_prompt, stream=True)):
+                            if i == 0: record("gemini.first_token", time.perf_counter() - started)
+                            response_text += chunk.text
+                            placeholder.markdown(response_text + "▌")
+                        m["response_chars"] = len(response_text)
+                    placeholder.markdown(response_text)
+                    
+                    # AI 메시지 기록
+                    st.session_state.chat_history.append({"role": "assistant", "content": response_text})
+                except Exception as e:
+                    placeholder.empty()
+                    log_event(f"AI 통신 오류: {e}")
+                    st.error(f"AI 통신 오류: {e}")
 
 # -------------------------------------------------------
 # [Tab 2] 실행실 (Naver API Report)
 # -------------------------------------------------------
 with tab_exec:
     st.subheader("📊 Naver 검색광고 리포트 추출")
-    st.info("네이버 광고 서버에 접속하여 어제 자 리포트를 다운로드합니다.")
+    st.info("네이버 광고 서버에 접속하여 어제 자 리포트를 다운로드합니다. 작업은 백그라운드에서 동시에 실행되므로 화면을 조작하거나 새로고침해도 계속 진행됩니다.")
     
     accounts = st.session_state.master_config.get("NAVER_ACCOUNTS", {})
     if not accounts:
         st.warning("⚠️ 등록된 계정이 없습니다. 사이드바에서 계정을 추가해주세요.")
     else:
-        selected_account_name = st.selectbox("대상 계정 선택", list(accounts.keys()))
+        account_names = list(accounts.keys())
+        run_all = st.checkbox(f"전체 계정 일괄 추출 ({len(account_names)}개)")
+        if run_all:
+            selected_account_names = account_names
+        else:
+            selected_account_names = st.multiselect("대상 계정 선택", account_names, default=account_names[:1])
         
-        if st.button("🚀 리포트 추출 시작", type="primary"):
-            target_account = accounts[selected_account_name]
-            try:
-                with st.spinner(f"[{selected_account_name}] 데이터 수신 중..."):
-                    # API 호출
-                    report_df, stat_date = download_naver_report(target_account)
-                    
-                    # 엑셀 변환
-                    output_excel = BytesIO()
-                    with pd.ExcelWriter(output_excel, engine='xlsxwriter') as writer:
-                        report_df.to_excel(writer, index=False)
-                    
-                    st.success(f"✅ 추출 성공! (날짜: {stat_date}, 데이터: {len(report_df)}행)")
-                    
-                    st.download_button(
-                        label=f"📥 리포트 다운로드 ({selected_account_name})",
-                        data=output_excel.getvalue(),
-                        file_name=f"Report_{selected_account_name}_{stat_date}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-            except Exception as e:
-                st.error(f"작업 실패: {e}")
+        run_mode = st.radio("추출 방식", ["📅 어제 리포트", "🗓️ 기간 백필 (누락일만)"], horizontal=True)
+        refresh = st.checkbox("🔄 저장된 리포트도 다시 받기", help="전환은 며칠 늦게 집계될 수 있습니다. 저장소에 있는 날짜도 새로 받아 덮어씁니다.")
+        refresh_tag = " (새로고침)" if refresh else ""
+        
+        if run_mode == "🗓️ 기간 백필 (누락일만)":
+            yesterday = datetime.date.today() - datetime.timedelta(days=1)
+            date_range = st.date_input("백필 기간", value=(yesterday - datetime.timedelta(days=29), yesterday), max_value=yesterday)
+            st.caption("저장소에 이미 있는 날짜는 다시 받기를 켜지 않으면 건너뛰고, 없는 날짜만 계정/일자 단위로 저장합니다.")
+            
+            if st.button("🗓️ 백필 시작", type="primary", disabled=not selected_account_names or len(date_range) != 2):
+                start_dt, end_dt = (d.strftime("%Y-%m-%d") for d in date_range)
+                new_job_ids = []
+                for name in selected_account_names:
+                    job_id = submit_job("naver_backfill", {"alias": name, "start": start_dt, "end": end_dt, "refresh": refresh}, label=f"{name} 백필 {start_dt}~{end_dt}{refresh_tag}")
+                    new_job_ids.append(job_id)
+                set_exec_job_ids(st.session_state.exec_job_ids + new_job_ids)
+                log_event(f"백필 작업 등록: {len(selected_account_names)}개 계정 ({start_dt}~{end_dt})")
+        
+        elif st.button("🚀 리포트 추출 시작", type="primary", disabled=not selected_account_names):
+            # 계정별 작업을 백그라운드 큐에 등록 (재실행/새로고침과 무관하게 계속 진행)
+            stat_dt = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+            new_job_ids = []
+            for name in selected_account_names:
+                job_id = submit_job("naver_report", {"alias": name, "stat_dt": stat_dt, "refresh": refresh}, label=f"{name} {stat_dt}{refresh_tag}")
+                new_job_ids.append(job_id)
+            set_exec_job_ids(st.session_state.exec_job_ids + new_job_ids)
+            log_event(f"리포트 추출 작업 등록: {len(selected_account_names)}개 계정 ({stat_dt})")
+        
+        # 작업 현황 (진행 중인 작업이 있으면 2초마다 이 영역만 갱신)
+        def show_job_monitor(was_active):
+            session_jobs = list_jobs(job_ids=st.session_state.exec_job_ids)
+            if not session_jobs: return
+            if was_active and not has_active_jobs(session_jobs):
+                st.rerun()
+            
+            st.divider()
+            st.markdown("##### 🛰️ 작업 현황")
+            status_icons = {"queued": "⏳ 대기", "running": "🔄 실행 중", "done": "✅ 완료", "failed": "❌ 실패"}
+            now = time.time()
+            st.dataframe(pd.DataFrame([{
+                "작업": job["label"],
+                "상태": status_icons.get(job["status"], job["status"]),
+                "진행": job["error"] or job["progress"] or "",
+                "소요(초)": round((job["finished_at"] or now) - (job["started_at"] or now), 1),
+            } for job in session_jobs]), hide_index=True, width='stretch')
+            
+            # 백필 실패일과 사유 (다음 백필 때 다시 요청됨)
+            backfill_errors = [(job["label"], day, err) for job in session_jobs if job["kind"] == "naver_backfill" and job["result"]
+                               for day, err in job["result"].get("errors", {}).items()]
+            if backfill_errors:
+                with st.expander(f"⚠️ 백필 실패 {len(backfill_errors)}일", expanded=False):
+                    st.dataframe(pd.DataFrame(backfill_errors, columns=["작업", "날짜", "오류"]), hide_index=True, width='stretch')
+            
+            # 다운로드 (완료된 리포트 작업, 클릭했을 때만 저장소에서 읽어 파일 생성)
+            done_reports = [job for job in session_jobs if job["kind"] == "naver_report" and job["status"] == "done"]
+            if done_reports and not has_active_jobs(session_jobs):
+                def load_done_frames():
+                    frames = {}
+                    for job in reversed(done_reports):
+                        r = job["result"]
+                        df = load_report(r["customer_id"], r["report_tp"], r["stat_dt"])
+                        if df is not None: frames[f"{job['params']['alias']}_{r['stat_dt']}"] = df
+                    return frames
+                
+                latest_dt = max(job["result"]["stat_dt"] for job in done_reports)
+                file_tag = done_reports[0]["params"]["alias"] if len(done_reports) == 1 else f"{len(done_reports)}accounts"
+                col_fmt, col_dl = st.columns([1, 2])
+                report_fmt = col_fmt.selectbox("파일 형식", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], key="report_export_fmt")
+                col_dl.download_button(
+                    label=f"📥 리포트 다운로드 ({len(done_reports)}건)",
+                    data=lambda: export_frames(load_done_frames(), report_fmt, sheet_col="계정"),
+                    file_name=f"Report_{file_tag}_{latest_dt}.{report_fmt}",
+                    mime=EXPORT_FORMATS[report_fmt][1],
+                    on_click="ignore"
+                )
+            if st.button("작업 목록 비우기"):
+                set_exec_job_ids([])
+                st.rerun()
+        
+        jobs_active = has_active_jobs(list_jobs(job_ids=st.session_state.exec_job_ids))
+        st.fragment(show_job_monitor, run_every=2 if jobs_active else None)(jobs_active)
+        
+        with st.expander("🗂️ 서버 전체 최근 작업", expanded=False):
+            recent_jobs = list_jobs(limit=20)
+            if recent_jobs:
+                st.dataframe(pd.DataFrame([{"ID": j["id"], "작업": j["label"], "상태": j["status"], "진행": j["error"] or j["progress"] or ""} for j in recent_jobs]), hide_index=True, width='stretch')
+                # 다른 세션/이전 창에서 등록한 작업도 작업 현황(진행/다운로드)으로 불러올 수 있음
+                reopen_ids = st.multiselect("작업 현황으로 불러오기", [j["id"] for j in recent_jobs if j["id"] not in st.session_state.exec_job_ids],
+                                            format_func=lambda i: next(f"#{j['id']} {j['label']}" for j in recent_jobs if j["id"] == i))
+                if st.button("불러오기", disabled=not reopen_ids):
+                    set_exec_job_ids(st.session_state.exec_job_ids + reopen_ids)
+                    st.rerun()
+            else:
+                st.caption("등록된 작업이 없습니다.")
 
 # -------------------------------------------------------
 # [Tab 4] 분석실 (Analysis Lab)
 # -------------------------------------------------------
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_keyword_trends(customer_id, store_signature):
+    # store_signature(저장된 날짜/수정시각)가 바뀔 때만 다시 집계 (세션 간 공유)
+    return keyword_trends(sync_keyword_history(customer_id))
+
 with tab_anal:
     st.subheader("💀 좀비 상품 살생부 (Analysis & Custom Export)")
     st.markdown("""
@@ -203,31 +360,113 @@ with tab_anal:
     3. **Selector:** 원하는 컬럼만 골라서 다운로드합니다.
     """)
     
-    uploaded_analyze_file = st.file_uploader("분석할 리포트 업로드 (Excel or CSV)", type=['xlsx', 'csv'])
+    data_source = st.radio("데이터 소스", ["📂 파일 업로드", "🗄️ 저장된 리포트", "📈 기간 추세 (저장된 리포트)"], horizontal=True)
+    uploaded_analyze_file, stored_report = None, None
+    alias_by_id = {acc['id']: alias for alias, acc in st.session_state.master_config.get("NAVER_ACCOUNTS", {}).items()}
     
-    if uploaded_analyze_file:
+    if data_source == "📂 파일 업로드":
+        uploaded_analyze_file = st.file_uploader("분석할 리포트 업로드 (Excel or CSV)", type=['xlsx', 'csv'])
+    elif data_source == "📈 기간 추세 (저장된 리포트)":
+        # 계정별 일별 키워드 표를 새 날짜만큼 갱신한 뒤 최근 7/14/30일 집계
+        stored_reports = list_reports(report_tp="AD")
+        trend_accounts = sorted({r['customer_id'] for r in stored_reports})
+        if not trend_accounts:
+            st.info("저장된 리포트가 없습니다. 실행실에서 기간 백필을 먼저 실행해주세요.")
+        else:
+            trend_cid = st.selectbox("계정 선택", trend_accounts, format_func=lambda cid: alias_by_id.get(cid, cid))
+            account_reports = [r for r in stored_reports if r['customer_id'] == trend_cid]
+            st.caption(f"저장된 일별 리포트 {len(account_reports)}일 ({account_reports[-1]['stat_dt']} ~ {account_reports[0]['stat_dt']})")
+            store_signature = tuple((r['stat_dt'], r['mtime']) for r in account_reports)
+            try:
+                with st.spinner("키워드별 기간 집계 중..."):
+                    trend_df = load_keyword_trends(trend_cid, store_signature)
+            except ValueError as ve:
+                st.error(f"추세 분석 오류: {ve}")
+                st.stop()
+            
+            if trend_df.empty:
+                st.info("집계할 키워드가 없습니다.")
+            else:
+                col_win, col_filter = st.columns(2)
+                trend_window = col_win.selectbox("기준 기간", TREND_WINDOWS, index=len(TREND_WINDOWS) - 1, format_func=lambda n: f"최근 {n}일")
+                only_no_sales = col_filter.checkbox("매출 없이 광고비만 쓴 키워드만", value=True)
+                view = trend_df
+                if only_no_sales:
+                    view = view[(view[f"광고비_{trend_window}일"] > 0) & (view[f"매출_{trend_window}일"] == 0)]
+                view = view.sort_values([f"지출일수_{trend_window}일", f"광고비_{trend_window}일"], ascending=False)
+                if only_no_sales:
+                    st.error(f"🚨 최근 {trend_window}일 동안 매출 없이 광고비만 쓴 키워드 {len(view)}개 (지출일수 순)")
+                else:
+                    st.caption(f"키워드 {len(view)}개")
+                st.dataframe(view.head(500), hide_index=True, width='stretch')
+                
+                trend_fmt = st.selectbox("파일 형식", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], key="trend_export_fmt")
+                st.download_button(
+                    label="📈 기간 추세 다운로드",
+                    data=lambda: export_frames({"Trends": view}, trend_fmt),
+                    file_name=export_file_name(f"Trends_{alias_by_id.get(trend_cid, trend_cid)}_{account_reports[0]['stat_dt']}", trend_fmt),
+                    mime=EXPORT_FORMATS[trend_fmt][1],
+                    on_click="ignore"
+                )
+    else:
+        stored_reports = list_reports()
+        if not stored_reports:
+            st.info("저장된 리포트가 없습니다. 실행실에서 리포트를 먼저 추출해주세요.")
+        else:
+            stored_report = st.selectbox(
+                "저장된 리포트 선택", stored_reports,
+                format_func=lambda r: f"{alias_by_id.get(r['customer_id'], r['customer_id'])} | {r['report_tp']} | {r['stat_dt']}"
+            )
+    
+    if uploaded_analyze_file or stored_report:
         try:
             # 1. X-Ray 프리뷰 (파일 읽기)
             st.divider()
             st.markdown("##### 🔍 X-Ray: 파일 내용 미리보기")
             
-            if uploaded_analyze_file.name.endswith('csv'):
-                try:
-                    df_raw = pd.read_csv(uploaded_analyze_file, encoding='utf-8')
-                except UnicodeDecodeError:
-                    uploaded_analyze_file.seek(0)
-                    df_raw = pd.read_csv(uploaded_analyze_file, encoding='cp949')
+            if stored_report:
+                source_key = f"{stored_report['path']}:{stored_report['mtime']}"
+                df_raw = load_report(stored_report['customer_id'], stored_report['report_tp'], stored_report['stat_dt'])
+                if df_raw is None:
+                    st.warning("⚠️ 저장된 리포트가 만료되었거나 읽을 수 없습니다.")
+                    st.stop()
+                if df_raw.empty:
+                    st.info("이 날은 광고 데이터가 없습니다. (네이버가 빈 리포트로 응답)")
+                    st.stop()
+                source_name = os.path.basename(stored_report['path'])
             else:
-                df_raw = pd.read_excel(uploaded_analyze_file)
+                # 파일 내용 해시로 캐시 (위젯 조작으로 재실행돼도 다시 파싱하지 않음)
+                file_bytes = uploaded_analyze_file.getvalue()
+                source_key = file_digest(file_bytes)
+                df_raw, schema_kind, first_row = parse_uploaded_report(source_key, uploaded_analyze_file.name, file_bytes)
+                source_name = uploaded_analyze_file.name
+                
+                # 스키마 판정 결과 안내 (파일은 판정된 스키마로 한 번만 읽음)
+                if schema_kind == "header":
+                    st.info("💡 파일에 포함된 '기존 제목'을 그대로 사용합니다.")
+                else:
+                    st.warning(f"🚨 제목줄이 감지되지 않았습니다. (첫 행: {first_row[0] if first_row else ''})\n👉 네이버 표준 양식을 적용합니다.")
+                    if schema_kind == "reverse":
+                        st.info("⚠️ 열 개수가 표준과 달라, 핵심 지표를 뒤에서부터 매칭합니다.")
             
             st.dataframe(df_raw.head())
-            st.caption(f"파일 정보: {uploaded_analyze_file.name} | 총 {len(df_raw)}행")
+            st.caption(f"파일 정보: {source_name} | 총 {len(df_raw)}행")
             
-            # 2. 분석 실행 버튼
-            if st.button("🔪 위 데이터로 살생부 분석 실행", type="primary"):
+            # 2. 분석 실행 버튼 (결과는 파일 해시 + 규칙 기준으로 보관)
+            zombie_rules = st.session_state.master_config.get("ZOMBIE_RULES")
+            analysis_key = (source_key, json.dumps(zombie_rules, sort_keys=True, ensure_ascii=False))
+            fresh_run = st.button("🔪 위 데이터로 살생부 분석 실행", type="primary")
+            if fresh_run or analysis_key in st.session_state.zombie_results:
                 try:
-                    # utils의 분석 함수 호출
-                    zombie_df = analyze_zombie_products(df_raw)
+                    if fresh_run:
+                        # utils의 분석 함수 호출
+                        with timed("analyze.zombie", rows=len(df_raw)) as m:
+                            zombie_df = analyze_zombie_products(df_raw, zombie_rules)
+                            m["zombies"] = len(zombie_df)
+                        log_event(f"살생부 분석: {source_name} ({len(df_raw)}행 → 좀비 {len(zombie_df)}개)")
+                        remember_result(st.session_state.zombie_results, analysis_key, zombie_df)
+                    else:
+                        zombie_df = remember_result(st.session_state.zombie_results, analysis_key)
                     zombie_count = len(zombie_df)
                     
                     if zombie_count > 0:
@@ -240,7 +479,7 @@ with tab_anal:
                         all_columns = zombie_df.columns.tolist()
                         
                         # 기본 선택 로직 (중요 키워드가 포함된 컬럼 자동 체크)
-                        important_keywords = ['ID', '키워드', '광고비', '노출', '클릭', '매출', '비용', 'Cost', 'Sales']
+                        important_keywords = ['ID', '키워드', '광고비', '노출', '클릭', '매출', '비용', 'Cost', 'Sales', '좀비사유']
                         default_selections = [col for col in all_columns if any(kw in str(col) for kw in important_keywords)]
                         if not default_selections: default_selections = all_columns
                         
@@ -256,22 +495,20 @@ with tab_anal:
                             st.caption(f"선택된 데이터 미리보기 ({len(selected_columns)}개 열)")
                             st.dataframe(final_df.head(3))
                             
-                            # 엑셀 다운로드 생성
-                            output_zombie = BytesIO()
-                            with pd.ExcelWriter(output_zombie, engine='xlsxwriter') as writer:
-                                final_df.to_excel(writer, index=False)
-                            
+                            # 다운로드 (클릭했을 때만 파일 생성)
+                            zombie_fmt = st.selectbox("파일 형식", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], key="zombie_export_fmt")
                             st.download_button(
                                 label="💀 선택 항목만 살생부 다운로드",
-                                data=output_zombie.getvalue(),
-                                file_name=generate_kill_list_filename(),
-                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                                data=lambda: export_frames({"Kill_List": final_df}, zombie_fmt),
+                                file_name=export_file_name(generate_kill_list_filename(), zombie_fmt),
+                                mime=EXPORT_FORMATS[zombie_fmt][1],
+                                on_click="ignore"
                             )
                         else:
                             st.warning("⚠️ 최소 1개 이상의 컬럼을 선택해야 합니다.")
                             
                     else:
-                        st.balloons()
+                        if fresh_run: st.balloons()
                         st.success("✨ 축하합니다! 좀비 상품이 하나도 없습니다. 광고 효율이 매우 좋습니다.")
 
                 except ValueError as ve:
@@ -280,4 +517,79 @@ with tab_anal:
                     st.error(f"알 수 없는 오류 발생: {e}")
                     
         except Exception as e:
-            st.error(f"파일 읽기 실패: {e}")
\ No newline at end of file
+            st.error(f"파일 읽기 실패: {e}")
+
+# -------------------------------------------------------
+# [Tab 5] 포트폴리오 (Portfolio Rollup)
+# -------------------------------------------------------
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_portfolio_rollup(store_signature, rules_json, alias_items, _reports):
+    # 원본 통합 프레임은 집계 후 버리고 작은 집계표만 캐시 (필터 조작은 집계표 위에서만)
+    frame = load_portfolio_frame(_reports, dict(alias_items))
+    if frame.empty: return None
+    return portfolio_rollup(frame, json.loads(rules_json))
+
+with tab_port:
+    st.subheader("🏢 전체 계정 통합 현황 (Portfolio)")
+    
+    all_reports = list_reports(report_tp="AD")
+    if not all_reports:
+        st.info("저장된 리포트가 없습니다. 실행실에서 리포트를 먼저 추출해주세요.")
+    else:
+        port_dates = sorted({r['stat_dt'] for r in all_reports})
+        col_start, col_end = st.columns(2)
+        port_start = col_start.selectbox("시작일", port_dates, index=len(port_dates) - 1)
+        port_end = col_end.selectbox("종료일", port_dates, index=len(port_dates) - 1)
+        port_reports = [r for r in all_reports if port_start <= r['stat_dt'] <= port_end]
+        
+        aliases = {acc['id']: alias for alias, acc in st.session_state.master_config.get("NAVER_ACCOUNTS", {}).items()}
+        rules_json = json.dumps(st.session_state.master_config.get("ZOMBIE_RULES"), sort_keys=True, ensure_ascii=False)
+        store_signature = tuple((r['customer_id'], r['stat_dt'], r['mtime']) for r in port_reports)
+        
+        rollup = None
+        if port_reports:
+            try:
+                with st.spinner(f"리포트 {len(port_reports)}개 통합 집계 중..."):
+                    rollup = load_portfolio_rollup(store_signature, rules_json, tuple(sorted(aliases.items())), port_reports)
+            except ValueError as ve:
+                st.error(f"집계 오류: {ve}")
+        if rollup is None:
+            st.warning("⚠️ 선택한 기간에 집계할 리포트가 없습니다.")
+        else:
+            accounts_df, campaigns_df, offenders_df = rollup
+            
+            # 계정 필터는 집계표에만 적용 (원본 재계산 없음)
+            account_names = accounts_df[ACCOUNT_COL].tolist()
+            selected_accounts = st.multiselect("계정 필터", account_names, default=account_names)
+            accounts_view = accounts_df[accounts_df[ACCOUNT_COL].isin(selected_accounts)]
+            campaigns_view = campaigns_df[campaigns_df[ACCOUNT_COL].isin(selected_accounts)]
+            offenders_view = offenders_df[offenders_df[ACCOUNT_COL].isin(selected_accounts)]
+            
+            total_cost, zombie_cost = int(accounts_view['광고비'].sum()), int(accounts_view['좀비광고비'].sum())
+            col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+            col_m1.metric("총 광고비", f"{total_cost:,}원")
+            col_m2.metric("총 매출", f"{int(accounts_view['매출'].sum()):,}원")
+            col_m3.metric("좀비 광고비", f"{zombie_cost:,}원")
+            col_m4.metric("좀비 비중", f"{zombie_cost / total_cost * 100:.1f}%" if total_cost else "-")
+            
+            st.markdown("##### 📋 계정별 합계")
+            st.dataframe(accounts_view, hide_index=True, width='stretch')
+            
+            st.markdown("##### 📂 캠페인별 합계")
+            sort_by = st.radio("정렬 기준", ["광고비", "좀비광고비", "좀비비중(%)"], horizontal=True)
+            st.dataframe(campaigns_view.nlargest(200, sort_by), hide_index=True, width='stretch')
+            
+            st.markdown("##### 💀 전체 계정 좀비 키워드 순위 (광고비 순)")
+            if offenders_view.empty:
+                st.success("✨ 선택한 계정/기간에 좀비 키워드가 없습니다.")
+            else:
+                st.dataframe(offenders_view.head(100), hide_index=True, width='stretch')
+            
+            port_fmt = st.selectbox("파일 형식", list(EXPORT_FORMATS), format_func=lambda f: EXPORT_FORMATS[f][0], key="port_export_fmt")
+            st.download_button(
+                label="🏢 포트폴리오 다운로드",
+                data=lambda: export_frames({"Accounts": accounts_view, "Campaigns": campaigns_view, "Offenders": offenders_view}, port_fmt),
+                file_name=export_file_name(f"Portfolio_{port_start}_{port_end}", port_fmt),
+                mime=EXPORT_FORMATS[port_fmt][1],
+                on_click="ignore"
+            )
@@ -0,0 +1,280 @@
+"""
+네이버 검색광고 API 로컬 대역 (벤치마크/부하 테스트용)
+
+api.searchad.naver.com의 리포트 흐름(/stat-reports 생성 → 상태 조회 → /report-download)을
+흉내 냅니다. get_naver_header 서명(HMAC-SHA256)을 실제로 검증하고, BUILT까지의 지연과
+계정별 요청 한도(429 + Retry-After)를 재현하며, 지정한 크기의 합성 TSV를 스트리밍합니다.
+
+사용법:
+    python mock_naver.py --port 8900 --rows 200000 --build-delay 2 --rate 10
+    NAVER_API_BASE=http://127.0.0.1:8900 streamlit run main.py
+    (사이드바에 출력된 Customer ID / Access Key / Secret Key로 계정 추가)
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import itertools
+import json
+import secrets
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+
+from utils import SCHEMA_14, SCHEMA_12
+
+MAX_CLOCK_SKEW_MS = 5 * 60 * 1000    # 서명 타임스탬프 허용 오차
+
+# --------------------------------------------------------------------------
+# [Data] 합성 리포트 생성 (벤치마크와 공용)
+# --------------------------------------------------------------------------
+LAYOUTS = {"14": SCHEMA_14, "12": SCHEMA_12}
+
+@lru_cache(maxsize=16)
+def _labels(fmt, n):
+    # ID/이름 문자열은 한 번만 만들고 인덱싱으로 펼침
+    return np.array([fmt.format(i) for i in range(n)], dtype=object)
+
+def make_report_table(rows, stat_dt="2024-01-01", layout="14", seed=0, customer_id="0", keywords=None):
+    """
+    표준 스키마(14열 또는 12열) 순서의 합성 리포트 DataFrame.
+    키워드는 keywords개(기본: rows의 1/2)를 돌려 써서 매체/지역별로 여러 행이 생기게 합니다.
+    """
+    rng = np.random.default_rng(seed)
+    keywords = keywords or max(1, rows // 2)
+    kw = rng.integers(0, keywords, rows)
+    imp = rng.integers(0, 5000, rows)
+    clk = np.minimum(imp, rng.integers(0, 60, rows))
+    cost = clk * rng.integers(50, 1500, rows)
+    sales = np.where(rng.random(rows) < 0.3, cost * rng.integers(0, 8, rows), 0)
+    values = {
+        '날짜': stat_dt.replace('-', ''),
+        '고객ID': customer_id,
+        '캠페인ID': _labels('cmp-a001-01-{:06d}', 50)[kw % 50],
+        '광고그룹ID': _labels('grp-a001-01-{:06d}', 500)[kw % 500],
+        '키워드ID': _labels('nkw-a001-01-{:09d}', keywords)[kw],
+        '키워드명': _labels('키워드{}', keywords)[kw],
+        '매체': rng.choice(['PC', 'MO'], rows),
+        '지역': rng.integers(1, 20, rows),
+        '순위': rng.integers(1, 15, rows),
+        '노출수': imp,
+        '클릭수': clk,
+        '클릭률': np.round(np.divide(clk * 100, imp, out=np.zeros(rows), where=imp > 0), 2),
+        '평균클릭비용': np.divide(cost, clk, out=np.zeros(rows), where=clk > 0).astype('int64'),
+        '광고비(원)': cost,
+        '전환수': (sales > 0).astype('int64'),
+        '전환매출액(원)': sales,
+    }
+    return pd.DataFrame({c: values[c] for c in LAYOUTS[layout]}, index=pd.RangeIndex(rows))
+
+def iter_report_tsv(rows, stat_dt="2024-01-01", layout="14", header=False, seed=0, customer_id="0", chunk_rows=50000):
+    """합성 리포트를 TSV 바이트 조각으로 생성합니다. (큰 리포트도 메모리에 한 번에 올리지 않음)"""
+    keywords = max(1, rows // 2)
+    for i, start in enumerate(range(0, rows, chunk_rows)):
+        n = min(chunk_rows, rows - start)
+        table = make_report_table(n, stat_dt, layout, seed + i, customer_id, keywords)
+        yield table.to_csv(sep='\t', header=header and i == 0, index=False).encode('utf-8')
+
+def make_report_tsv(rows, stat_dt="2024-01-01", layout="14", header=False, seed=0, customer_id="0"):
+    return b"".join(iter_report_tsv(rows, stat_dt, layout, header, seed, customer_id))
+
+# --------------------------------------------------------------------------
+# [Server] API 대역
+# --------------------------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args): pass
+
+    def _send_json(self, code, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items(): self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorize(self, method):
+        """서명 검증 + 요청 한도 확인. 통과하면 고객ID, 아니면 응답을 보내고 None을 반환합니다."""
+        mock = self.server.mock
+        path = urlparse(self.path).path
+        customer_id, api_key = self.headers.get("X-Customer"), self.headers.get("X-API-KEY")
+        ts, signature = self.headers.get("X-Timestamp", ""), self.headers.get("X-Signature", "")
+        account = mock.accounts.get(customer_id)
+        expected = ""
+        if account and account["key"] == api_key and ts.isdigit():
+            msg = f"{ts}.{method}.{path}".encode()
+            expected = base64.b64encode(hmac.new(account["secret"].encode(), msg, hashlib.sha256).digest()).decode()
+        if not expected or not hmac.compare_digest(expected, signature):
+            mock.count("bad_signature")
+            self._send_json(401, {"code": 1014, "title": "Signature is invalid"})
+            return None
+        if abs(time.time() * 1000 - int(ts)) > MAX_CLOCK_SKEW_MS:
+            mock.count("bad_signature")
+            self._send_json(401, {"code": 1015, "title": "Timestamp is out of range"})
+            return None
+        if not mock.take_token(customer_id):
+            mock.count("throttled")
+            self._send_json(429, {"code": 1016, "title": "Too many requests"}, {"Retry-After": "1"})
+            return None
+        return customer_id
+
+    def do_POST(self):
+        self.server.mock.count("requests")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        customer_id = self._authorize("POST")
+        if customer_id is None: return
+        if urlparse(self.path).path != "/stat-reports":
+            return self._send_json(404, {"title": "Not Found"})
+        try:
+            spec = json.loads(body or b"{}")
+            stat_dt = str(spec["statDt"])[:10]
+        except (ValueError, KeyError):
+            return self._send_json(400, {"title": "statDt is required"})
+        job = self.server.mock.create_job(customer_id, spec.get("reportTp", "AD"), stat_dt)
+        self._send_json(200, {"reportJobId": job["id"], "reportTp": job["reportTp"], "statDt": stat_dt, "status": "REGIST"})
+
+    def do_GET(self):
+        mock = self.server.mock
+        mock.count("requests")
+        customer_id = self._authorize("GET")
+        if customer_id is None: return
+        url = urlparse(self.path)
+        if url.path.startswith("/stat-reports/"):
+            job = mock.get_job(customer_id, url.path.rsplit('/', 1)[1])
+            if job is None: return self._send_json(404, {"title": "Report job not found"})
+            built = time.monotonic() - job["created"] >= mock.build_delay
+            status = "RUNNING"
+            if built:
+                status = "ERROR" if job["statDt"] in mock.fail_dates else "NONE" if job["statDt"] in mock.empty_dates else "BUILT"
+            info = {"reportJobId": job["id"], "reportTp": job["reportTp"], "statDt": job["statDt"], "status": status}
+            if status == "BUILT": info["downloadUrl"] = f"{mock.url}/report-download?fileVersion=v2&jobId={job['id']}"
+            return self._send_json(200, info)
+        if url.path == "/report-download":
+            job = mock.get_job(customer_id, parse_qs(url.query).get("jobId", [""])[0])
+            if job is None: return self._send_json(404, {"title": "Report not found"})
+            return self._stream_report(job)
+        self._send_json(404, {"title": "Not Found"})
+
+    def _stream_report(self, job):
+        mock = self.server.mock
+        self.send_response(200)
+        self.send_header("Content-Type", "text/tab-separated-values;charset=UTF-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in iter_report_tsv(mock.rows, job["statDt"], mock.layout, mock.header, seed=job["id"], customer_id=job["customer"]):
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            mock.count("bytes_sent", len(chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 클라이언트가 먼저 연결을 끊는 경우(커넥션 풀 정리 등)는 무시
+        if not isinstance(sys.exc_info()[1], ConnectionError): super().handle_error(request, client_address)
+
+class MockNaverServer:
+    """
+    스레드에서 도는 API 대역 서버. with 문으로 쓰면 시작/종료가 자동입니다.
+    rows/layout/header: 리포트 크기와 형태 ('14' | '12', 헤더 포함 여부)
+    build_delay: 작업 생성 후 BUILT가 될 때까지 걸리는 시간(초)
+    rate/burst: 계정별 초당 요청 한도와 순간 허용량 (넘으면 429 + Retry-After)
+    fail_dates: 이 statDt의 작업은 BUILT 대신 ERROR로 끝남
+    empty_dates: 이 statDt의 작업은 데이터 없음(NONE)으로 끝남
+    """
+    def __init__(self, host="127.0.0.1", port=0, rows=10000, layout="14", header=False,
+                 build_delay=1.0, rate=20.0, burst=10, fail_dates=(), empty_dates=()):
+        if layout not in LAYOUTS: raise ValueError(f"알 수 없는 리포트 형태: {layout}")
+        self.rows, self.layout, self.header = rows, layout, header
+        self.build_delay, self.rate, self.burst = build_delay, rate, burst
+        self.fail_dates, self.empty_dates = set(fail_dates), set(empty_dates)
+        self.accounts = {}
+        self.stats = dict.fromkeys(["requests", "throttled", "bad_signature", "reports_created", "bytes_sent"], 0)
+        self._jobs = {}
+        self._buckets = {}
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.mock = self
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self._thread = None
+
+    def add_account(self, alias="mock", customer_id=None, key=None, secret=None):
+        """계정을 등록하고 config.json의 NAVER_ACCOUNTS 항목 형식으로 반환합니다."""
+        account = {"id": customer_id or str(100000 + len(self.accounts)),
+                   "key": key or secrets.token_hex(16), "secret": secret or secrets.token_urlsafe(24)}
+        self.accounts[account["id"]] = account
+        return account
+
+    def count(self, name, n=1):
+        with self._lock: self.stats[name] += n
+
+    def take_token(self, customer_id):
+        # 계정별 토큰 버킷
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(customer_id, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[customer_id] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+    def create_job(self, customer_id, report_tp, stat_dt):
+        with self._lock:
+            job = {"id": next(self._ids), "customer": customer_id, "reportTp": report_tp,
+                   "statDt": stat_dt, "created": time.monotonic()}
+            self._jobs[job["id"]] = job
+            self.stats["reports_created"] += 1
+        return job
+
+    def get_job(self, customer_id, job_id):
+        job = self._jobs.get(int(job_id)) if str(job_id).isdigit() else None
+        return job if job and job["customer"] == customer_id else None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-naver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Naver Search Ad API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--rows", type=int, default=10000, help="리포트 한 건의 행 수")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="14")
+    parser.add_argument("--header", action="store_true", help="첫 줄에 컬럼명 포함")
+    parser.add_argument("--build-delay", type=float, default=2.0)
+    parser.add_argument("--rate", type=float, default=20.0, help="계정별 초당 요청 한도")
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--accounts", type=int, default=1)
+    args = parser.parse_args()
+
+    mock = MockNaverServer(args.host, args.port, args.rows, args.layout, args.header, args.build_delay, args.rate, args.burst)
+    print(f"Naver API stand-in: {mock.url}  (NAVER_API_BASE={mock.url})")
+    for i in range(args.accounts):
+        acc = mock.add_account()
+        print(f"  account {i + 1}: Customer ID={acc['id']}  Access Key={acc['key']}  Secret Key={acc['secret']}")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.httpd.server_close()
+        print(json.dumps(mock.stats))
+
+if __name__ == "__main__":
+    main()
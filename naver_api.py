@@ -1,12 +1,23 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+import os
 import time
+import re
+import random
+import itertools
+import threading
 import hmac
 import hashlib
 import base64
 import datetime
 from urllib.parse import urlparse
 import pandas as pd
-from io import StringIO
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import coerce_numeric, report_read_options, relaxed_read_options, concat_frames, REPORT_DTYPES, SCHEMA_14
+from perf import timed
+from report_store import load_report, save_report, stored_dates
 
 def get_naver_header(method, uri, api_key, secret_key, customer_id):
     ts = str(int(time.time() * 1000))
@@ -17,45 +28,289 @@ def get_naver_header(method, uri, api_key, secret_key, customer_id):
         "X-API-KEY": api_key, "X-Customer": customer_id, "X-Signature": sign
     }
 
-def download_naver_report(target_acc):
+NAVER_API_BASE = os.environ.get("NAVER_API_BASE", "https://api.searchad.naver.com")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+def _not_sent(e):
+    # 연결 자체를 맺지 못한 오류인지 (요청이 서버에 도달하지 않았음이 확실한 경우)
+    if isinstance(e, requests.ConnectTimeout): return True
+    cause = e.args[0] if e.args else None
+    return isinstance(getattr(cause, "reason", cause), NewConnectionError)
+
+class NaverClient:
+    """
+    계정 하나의 인증정보와 keep-alive 커넥션 풀을 공유하는 API 클라이언트.
+    - 모든 요청에 서명 헤더를 붙이고, 연결/읽기 타임아웃을 적용합니다.
+    - 429/5xx 및 네트워크 오류는 지터가 섞인 지수 백오프로 재시도합니다.
+      POST처럼 멱등이 아닌 요청은 서버가 이미 처리했을 수 있으므로 429와 연결 실패만 재시도합니다.
+    - 계정별 동시 요청 수(max_concurrency)와 최소 요청 간격(min_interval)을 제한합니다.
+    """
+    def __init__(self, account, base_url=None, connect_timeout=5, read_timeout=30,
+                 max_retries=4, backoff_base=0.5, backoff_max=20, max_concurrency=4, min_interval=0.1):
+        self.account = account
+        self.base_url = (base_url or NAVER_API_BASE).rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_interval = min_interval
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pace_lock = threading.Lock()
+        self._next_call = 0.0
+
+    def _wait_turn(self):
+        # 계정 단위 요청 간격 제한
+        with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.min_interval
+        if wait > 0: time.sleep(wait)
+
+    def _backoff(self, attempt, res=None):
+        retry_after = res.headers.get("Retry-After") if res is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, uri, **kwargs):
+        """uri는 '/stat-reports' 같은 경로 또는 downloadUrl 같은 전체 URL을 받습니다."""
+        url = uri if uri.startswith("http") else self.base_url + uri
+        path = urlparse(url).path
+        acc = self.account
+
+        endpoint = "download" if uri.startswith("http") else re.sub(r"/\d+$", "/{id}", path)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_status = RETRY_STATUS if idempotent else {429}
+
+        with timed("naver.http", method=method, endpoint=endpoint, account=acc['id']) as m:
+            for attempt in range(self.max_retries + 1):
+                m["attempts"] = attempt + 1
+                self._wait_turn()
+                headers = get_naver_header(method, path, acc['key'], acc['secret'], acc['id'])
+                try:
+                    with self._slots:
+                        res = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt == self.max_retries or not (idempotent or _not_sent(e)): raise
+                    time.sleep(self._backoff(attempt))
+                    continue
+
+                if res.status_code in retry_status and attempt < self.max_retries:
+                    delay = self._backoff(attempt, res)
+                    res.close()
+                    time.sleep(delay)
+                    continue
+                m["status"] = res.status_code
+                return res
+
+    def get(self, uri, **kwargs): return self.request("GET", uri, **kwargs)
+    def post(self, uri, **kwargs): return self.request("POST", uri, **kwargs)
+
+    def close(self): self.session.close()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(target_acc):
+    """계정별 클라이언트를 재사용합니다. (키가 바뀌면 새로 생성)"""
+    cache_key = (target_acc['id'], target_acc['key'], target_acc['secret'])
+    with _clients_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            client = _clients[cache_key] = NaverClient(target_acc)
+        return client
+
+# 진행 중인 리포트 작업 기록: (고객ID, reportTp, statDt) -> reportJobId
+# Streamlit 재실행이나 대기 시간 초과 후 다시 요청하면 새로 만들지 않고 기존 작업을 이어받습니다.
+_report_jobs = {}
+_report_jobs_lock = threading.Lock()
+
+FAILED_STATUS = {"ERROR"}
+NO_DATA_STATUS = "NONE"     # 그날 데이터가 없는 계정 (실패가 아니라 빈 리포트)
+
+def remember_report_job(job_key, jid):
+    with _report_jobs_lock:
+        if jid is None: _report_jobs.pop(job_key, None)
+        else: _report_jobs[job_key] = jid
+
+def get_report_job(job_key):
+    with _report_jobs_lock:
+        return _report_jobs.get(job_key)
+
+def get_report_status(client, jid):
+    """리포트 작업 상태 조회. 작업이 없으면 None을 반환합니다."""
+    r = client.get(f"/stat-reports/{jid}")
+    if r.status_code in RETRY_STATUS:
+        # 재시도 후에도 요청 한도 초과/서버 오류면 작업은 살아 있는 것으로 보고 다음 폴링에서 다시 확인
+        return {"status": "UNAVAILABLE"}
+    if r.status_code != 200: return None
+    return r.json()
+
+def create_report_job(client, job_key):
+    """기록된 작업이 살아 있으면 재사용하고, 없으면 새 리포트 작업을 생성합니다."""
+    jid = get_report_job(job_key)
+    if jid is not None:
+        info = get_report_status(client, jid)
+        if info and info.get("status") not in FAILED_STATUS:
+            return jid
+        remember_report_job(job_key, None)
+
+    customer_id, report_tp, stat_dt = job_key
+    with timed("naver.create", account=customer_id):
+        res = client.post("/stat-reports", json={"reportTp": report_tp, "statDt": stat_dt})
+    if res.status_code != 200:
+        raise Exception(f"리포트 생성 실패: {res.text}")
+
+    jid = res.json()["reportJobId"]
+    remember_report_job(job_key, jid)
+    return jid
+
+def wait_for_report(client, jid, deadline=120, first_interval=0.5, max_interval=5.0, factor=1.6):
+    """
+    적응형 폴링: 처음엔 짧게, 갈수록 길게 확인하며 deadline(초)까지 기다립니다.
+    BUILT가 되면 downloadUrl을, 데이터가 없는 날(NONE)이면 None을 반환합니다.
+    """
+    started = time.monotonic()
+    interval = first_interval
+    with timed("naver.wait", account=client.account['id']) as m:
+        for polls in itertools.count(1):
+            m["polls"] = polls
+            info = get_report_status(client, jid)
+            status = info.get("status") if info else None
+            if status == "BUILT":
+                return info["downloadUrl"]
+            if status == NO_DATA_STATUS:
+                return None
+            if info is None or status in FAILED_STATUS:
+                raise Exception(f"리포트 작업 실패 (jobId: {jid}, 상태: {status})")
+
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise Exception(f"다운로드 URL 확보 실패: {deadline}초 내에 리포트가 완성되지 않았습니다. 다시 실행하면 기존 작업(jobId: {jid})을 이어서 기다립니다.")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * factor, max_interval)
+
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+def fetch_report_file(client, durl, chunk_size=1024 * 1024):
+    """
+    리포트를 조각 단위로 받아 임시 파일에 씁니다. (응답 전체를 메모리에 올리지 않음)
+    32MB까지는 메모리, 그 이상은 디스크에 보관되며 읽기 위치는 처음으로 되돌려 반환합니다.
+    """
+    fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
     try:
-        base_url = "https://api.searchad.naver.com"
-        stat_dt = (datetime.datetime.now() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        with timed("naver.download", account=client.account['id']) as m, client.get(durl, stream=True) as file_res:
+            if file_res.status_code != 200:
+                raise Exception(f"리포트 다운로드 실패: {file_res.status_code}")
+            for chunk in file_res.iter_content(chunk_size=chunk_size):
+                fp.write(chunk)
+            m["bytes"] = fp.tell()
+        fp.seek(0)
+        return fp
+    except Exception:
+        fp.close()
+        raise
 
-        # 1. 생성
-        uri = "/stat-reports"
-        headers = get_naver_header("POST", uri, target_acc['key'], target_acc['secret'], target_acc['id'])
-        res = requests.post(base_url + uri, headers=headers, json={"reportTp": "AD", "statDt": stat_dt})
+def parse_report_tsv(fp, chunksize=None):
+    """
+    TSV 리포트를 파싱합니다. 첫 줄로 헤더 유무/표준 스키마를 먼저 판정한 뒤
+    컬럼별 고정 타입으로 한 번만 읽습니다. (헤더 없는 API 원본도 바로 표준 컬럼명으로)
+    chunksize를 주면 청크 단위로 읽어 이어붙입니다. (파서의 임시 메모리 사용량 제한)
+    """
+    first_row = fp.readline().decode('utf-8', errors='ignore').rstrip('\r\n').split('\t')
+    fp.seek(0)
+    options, _ = report_read_options(first_row)
 
-        if res.status_code != 200:
-            raise Exception(f"리포트 생성 실패: {res.text}")
+    with timed("naver.parse") as m:
+        try:
+            if chunksize:
+                with pd.read_csv(fp, sep='\t', chunksize=chunksize, **options) as reader:
+                    df = concat_frames(list(reader))
+            else:
+                df = pd.read_csv(fp, sep='\t', **options)
+        except (ValueError, TypeError, OverflowError):
+            # 숫자 컬럼에 빈 값/문자가 섞이거나 int64를 넘는 값이 있으면 숫자 타입 지정 없이 다시 파싱
+            fp.seek(0)
+            df = pd.read_csv(fp, sep='\t', **relaxed_read_options(options))
+        m["rows"] = len(df)
+    return df
 
-        jid = res.json()["reportJobId"]
+def empty_report_frame():
+    """데이터가 없는 날의 리포트 (표준 14열 스키마, 0행)"""
+    return pd.DataFrame({c: pd.Series(dtype=REPORT_DTYPES.get(c, 'object')) for c in SCHEMA_14})
+
+def download_naver_report(target_acc, client=None, poll_deadline=120, use_cache=True, stat_dt=None, on_job=None):
+    """
+    계정 하나의 statDt 리포트를 (DataFrame, statDt)로 반환합니다.
+    on_job(job_key, jobId): 리포트 작업을 만들거나 이어받은 직후 호출 (프로세스 재시작 후 이어받을 수 있게 기록하는 용도)
+    """
+    try:
+        stat_dt = stat_dt or (datetime.datetime.now() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        job_key = (target_acc['id'], "AD", stat_dt)
+
+        # 0. 로컬 저장소 확인 (같은 계정/날짜는 API를 다시 호출하지 않음)
+        if use_cache:
+            with timed("store.load", account=target_acc['id']) as m:
+                cached = load_report(*job_key)
+                m["hit"] = cached is not None
+                m["rows"] = len(cached) if cached is not None else 0
+            if cached is not None: return cached, stat_dt
+
+        client = client or get_client(target_acc)
+
+        # 1. 생성 (진행 중인 작업이 있으면 재사용)
+        jid = create_report_job(client, job_key)
+        if on_job: on_job(job_key, jid)
 
         # 2. 대기
-        durl = None
-        for i in range(10):
-            time.sleep(2)
-            uri_chk = f"/stat-reports/{jid}"
-            h = get_naver_header("GET", uri_chk, target_acc['key'], target_acc['secret'], target_acc['id'])
-            r = requests.get(base_url + uri_chk, headers=h)
-            if r.json()["status"] == "BUILT":
-                durl = r.json()["downloadUrl"]
-                break
-
-        if not durl:
-            raise Exception("다운로드 URL 확보 실패")
-
-        # 3. 다운로드 & 변환
-        parsed = urlparse(durl)
-        h_dl = get_naver_header("GET", parsed.path, target_acc['key'], target_acc['secret'], target_acc['id'])
-        file_res = requests.get(durl, headers=h_dl)
-
-        df = pd.read_csv(StringIO(file_res.text), sep='\t')
+        durl = wait_for_report(client, jid, deadline=poll_deadline)
+
+        # 3. 다운로드 & 변환 (스트리밍) / 데이터가 없는 날은 빈 리포트로 저장해 백필이 다시 요청하지 않게 함
+        if durl is None:
+            df = empty_report_frame()
+        else:
+            with fetch_report_file(client, durl) as fp:
+                df = parse_report_tsv(fp)
         rename_map = {'statDt':'날짜', 'salesAmt':'광고비(원)', 'convAmt':'전환매출액(원)', 'impCnt':'노출수', 'clkCnt':'클릭수'}
         df.rename(columns=rename_map, inplace=True)
+        metric_cols = [c for c in ['노출수', '클릭수', '광고비(원)', '전환매출액(원)'] if c in df.columns]
+        if metric_cols: coerce_numeric(df, metric_cols)
+
+        # 다운로드까지 끝난 작업은 기록에서 제거하고 저장소에 보관
+        remember_report_job(job_key, None)
+        save_report(df, *job_key)
 
         return df, stat_dt
 
     except Exception as e:
-        raise Exception(f"네이버 API 오류: {e}")
\ No newline at end of file
+        raise Exception(f"네이버 API 오류: {e}")
+
+def backfill_naver_reports(accounts, start_date, end_date, max_workers=8, on_job=None, refresh=False):
+    """
+    기간 백필: 계정별로 저장소에 없는 날짜만 골라 병렬로 추출합니다.
+    refresh=True면 저장된 날짜도 모두 다시 받아 덮어씁니다. (늦게 집계된 전환 반영)
+    추출된 리포트는 계정/날짜 단위로 저장소에 쌓이고, 완료되는 순서대로
+    (별칭, statDt, df 또는 Exception)을 yield 합니다. 요청 간격은 계정별 클라이언트가 제한합니다.
+    on_job은 download_naver_report에 그대로 전달됩니다.
+    """
+    days = pd.date_range(start_date, end_date, freq='D').strftime("%Y-%m-%d").tolist()
+    jobs = []
+    for alias, acc in accounts.items():
+        have = set() if refresh else stored_dates(acc['id'], "AD")
+        jobs += [(alias, acc, day) for day in days if day not in have]
+    if not jobs: return
+
+    workers = max(1, min(max_workers, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="naver-backfill") as pool:
+        futures = {pool.submit(download_naver_report, acc, stat_dt=day, on_job=on_job, use_cache=not refresh): (alias, day) for alias, acc, day in jobs}
+        for fut in as_completed(futures):
+            alias, day = futures[fut]
+            try: yield alias, day, fut.result()[0]
+            except Exception as e: yield alias, day, e
\ No newline at end of file
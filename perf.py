@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import time
+import datetime
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# [Perf] 단계별 소요 시간 / 처리량 기록
+# 프로세스 전체에서 공유되는 링버퍼에 쌓이며 (워커 스레드 포함), 사이드바 성능 패널에서 확인합니다.
+# --------------------------------------------------------------------------
+MAX_EVENTS = 5000
+
+_events = deque(maxlen=MAX_EVENTS)
+_lock = threading.Lock()
+
+def record(stage, seconds, **fields):
+    """측정값 하나를 기록합니다. fields에는 bytes, rows, account 등 자유롭게 넣을 수 있습니다."""
+    event = {
+        "ts": datetime.datetime.now().isoformat(timespec='milliseconds'),
+        "stage": stage,
+        "seconds": round(seconds, 6),
+        "thread": threading.current_thread().name,
+        **fields,
+    }
+    with _lock: _events.append(event)
+    return event
+
+@contextmanager
+def timed(stage, **fields):
+    """
+    with 블록의 소요 시간을 기록합니다. 블록 안에서 yield된 dict에 값을 넣으면 함께 기록됩니다.
+        with timed("naver.download", account=cid) as m:
+            ...
+            m["bytes"] = size
+    """
+    info = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield info
+    except BaseException:
+        info["ok"] = False
+        raise
+    finally:
+        info.setdefault("ok", True)
+        record(stage, time.perf_counter() - start, **info)
+
+def timed_fn(stage):
+    """함수 전체를 측정하는 데코레이터"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_events():
+    with _lock: return list(_events)
+
+def clear_events():
+    with _lock: _events.clear()
+
+def summarize_events(events=None):
+    """단계별 집계: 횟수, 합계/평균/p95/최대 시간, 처리한 바이트/행 수"""
+    df = pd.DataFrame(events if events is not None else get_events())
+    if df.empty: return df
+    for col in ["bytes", "rows"]:
+        if col not in df.columns: df[col] = 0
+    grouped = df.groupby("stage")
+    summary = pd.DataFrame({
+        "횟수": grouped.size(),
+        "합계(초)": grouped["seconds"].sum(),
+        "평균(초)": grouped["seconds"].mean(),
+        "p95(초)": grouped["seconds"].quantile(0.95),
+        "최대(초)": grouped["seconds"].max(),
+        "바이트": grouped["bytes"].sum(),
+        "행": grouped["rows"].sum(),
+    })
+    return summary.sort_values("합계(초)", ascending=False).round(3)
+
+def export_events(fmt="json"):
+    """기록 전체를 JSON 또는 CSV bytes로 내보냅니다."""
+    events = get_events()
+    if fmt == "json":
+        return json.dumps(events, ensure_ascii=False, indent=2, default=str).encode('utf-8')
+    fields = list(dict.fromkeys(k for e in events for k in e))
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(events)
+    return out.getvalue().encode('utf-8-sig')
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from perf import timed
+from report_store import load_report
+from utils import concat_frames
+from trends import REPORT_COLUMNS, KEY_COL, DATE_COL, NAME_COL, CAMPAIGN_COL
+from zombie_rules import BASE_METRICS, DERIVED_METRICS, evaluate_rules
+
+# --------------------------------------------------------------------------
+# [Portfolio] 전체 계정 통합 현황
+# 저장된 리포트를 계정 구분 컬럼(category)과 함께 하나로 이어붙인 뒤
+# 좀비 판정 1회 + (계정, 캠페인) groupby 1회로 합계를 만듭니다.
+# 화면의 필터링은 이렇게 줄어든 집계표 위에서만 하므로 원본 행 수와 무관하게 빠릅니다.
+# --------------------------------------------------------------------------
+ACCOUNT_COL = '계정'
+REASON_COL = '좀비사유'
+PORTFOLIO_COLUMNS = [c for names in REPORT_COLUMNS.values() for c in names]
+OFFENDER_LIMIT = 1000       # 계정 전체에서 광고비 상위 좀비 키워드만 보관
+DISPLAY_NAMES = {'cost': '광고비', 'sales': '매출', 'imp': '노출', 'clk': '클릭', 'zombie_cost': '좀비광고비', 'zombie_days': '좀비일수'}
+
+def load_portfolio_frame(reports, aliases=None):
+    """
+    reports(list_reports 항목)를 읽어 표준 컬럼 하나의 DataFrame으로 합칩니다.
+    계정/캠페인은 category, 지표는 int64, 날짜는 저장된 statDt를 씁니다.
+    키워드ID/키워드명은 고유값이 행 수만큼 많아 category를 합치는 비용이 더 크므로 문자열로 둡니다.
+    """
+    aliases = aliases or {}
+    account_names = sorted({aliases.get(r['customer_id'], r['customer_id']) for r in reports})
+    frames = []
+    with timed("portfolio.load", reports=len(reports)) as m:
+        for r in reports:
+            df = load_report(r['customer_id'], r['report_tp'], r['stat_dt'], columns=PORTFOLIO_COLUMNS)
+            if df is None or df.empty: continue
+            out = {}
+            for std, names in REPORT_COLUMNS.items():
+                col = next((c for c in names if c in df.columns), None)
+                if std == DATE_COL or col is None: continue
+                if std in BASE_METRICS: out[std] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int64')
+                elif std == CAMPAIGN_COL: out[std] = df[col]
+                else: out[std] = df[col].astype(str)
+            if KEY_COL not in out or not all(k in out for k in BASE_METRICS): continue
+            frame = pd.DataFrame(out)
+            code = account_names.index(aliases.get(r['customer_id'], r['customer_id']))
+            frame[ACCOUNT_COL] = pd.Categorical.from_codes(np.full(len(frame), code), categories=account_names)
+            frame[DATE_COL] = pd.Timestamp(r['stat_dt'])
+            frames.append(frame)
+        if not frames: return pd.DataFrame()
+        combined = concat_frames(frames, (CAMPAIGN_COL,))
+        m["rows"] = len(combined)
+    return combined
+
+def _with_ratios(table):
+    metrics = {k: table[k].to_numpy() for k in BASE_METRICS}
+    table['CTR(%)'] = DERIVED_METRICS['ctr'](metrics).round(2)
+    table['ROAS(%)'] = DERIVED_METRICS['roas'](metrics).round(1)
+    table['좀비비중(%)'] = np.where(table['cost'] > 0, table['zombie_cost'] / table['cost'].where(table['cost'] > 0, 1) * 100, 0).round(1)
+    return table.rename(columns=DISPLAY_NAMES)
+
+def portfolio_rollup(frame, rules=None):
+    """
+    반환: (accounts, campaigns, offenders)
+    - campaigns: 계정×캠페인 합계 (원본 전체를 groupby 한 번)
+    - accounts: campaigns를 다시 계정별로 합친 것
+    - offenders: 좀비 행만 (계정, 키워드)로 합쳐 광고비 상위 OFFENDER_LIMIT개
+    광고비 소진액 기준 좀비 비중(zombie_cost / cost)을 함께 계산합니다.
+    """
+    with timed("portfolio.rollup", rows=len(frame)) as m:
+        labels = evaluate_rules(frame, {k: k for k in BASE_METRICS}, rules,
+                                date_col=DATE_COL, key_col=KEY_COL,
+                                campaign_col=CAMPAIGN_COL if CAMPAIGN_COL in frame.columns else None)
+        is_zombie = labels.notna().to_numpy()
+        group_cols = [ACCOUNT_COL] + ([CAMPAIGN_COL] if CAMPAIGN_COL in frame.columns else [])
+
+        base = frame[group_cols + list(BASE_METRICS)].assign(zombie_cost=np.where(is_zombie, frame['cost'].to_numpy(), 0))
+        campaigns = base.groupby(group_cols, observed=True, sort=False).sum()
+        accounts = campaigns.groupby(level=ACCOUNT_COL, observed=True).sum()
+
+        zombies = frame[is_zombie].assign(**{REASON_COL: labels[is_zombie]})
+        agg = {k: 'sum' for k in BASE_METRICS}
+        agg.update({c: 'last' for c in (NAME_COL, CAMPAIGN_COL, REASON_COL) if c in zombies.columns})
+        agg['zombie_days'] = 'nunique'
+        offenders = (zombies.rename(columns={DATE_COL: 'zombie_days'})
+                     .groupby([ACCOUNT_COL, KEY_COL], observed=True, sort=False).agg(agg)
+                     .nlargest(OFFENDER_LIMIT, 'cost'))
+        m["zombies"] = int(is_zombie.sum())
+
+    accounts = _with_ratios(accounts).sort_values('광고비', ascending=False).reset_index()
+    campaigns = _with_ratios(campaigns).sort_values('광고비', ascending=False).reset_index()
+    offenders = offenders.rename(columns=DISPLAY_NAMES).reset_index()
+    for c in (ACCOUNT_COL, KEY_COL, NAME_COL, CAMPAIGN_COL, REASON_COL):
+        if c in offenders.columns: offenders[c] = offenders[c].astype(str)
+    for table in (accounts, campaigns):
+        for c in (ACCOUNT_COL, CAMPAIGN_COL):
+            if c in table.columns: table[c] = table[c].astype(str)
+    return accounts, campaigns, offenders
@@ -0,0 +1,112 @@
+import os
+import time
+import threading
+import pandas as pd
+import pyarrow.parquet as pq
+
+# --------------------------------------------------------------------------
+# [Report Store] 로컬 리포트 저장소
+# 경로: report_store/{고객ID}/{reportTp}/{statDt}.parquet
+# --------------------------------------------------------------------------
+STORE_DIR = os.environ.get("AC_REPORT_STORE", "report_store")
+REPORT_TTL_SECONDS = 400 * 24 * 3600    # 저장 후 400일이 지나면 만료 (기간 백필 이력 보존)
+STORE_MAX_BYTES = 5 * 1024 ** 3         # 전체 용량이 5GB를 넘으면 오래된 것부터 삭제
+
+_evict_lock = threading.Lock()
+
+def report_path(customer_id, report_tp, stat_dt):
+    return os.path.join(STORE_DIR, str(customer_id), report_tp, f"{stat_dt}.parquet")
+
+def load_report(customer_id, report_tp, stat_dt, ttl=REPORT_TTL_SECONDS, columns=None):
+    """
+    저장된 리포트가 있고 만료되지 않았으면 DataFrame을, 아니면 None을 반환합니다.
+    columns를 주면 그 중 파일에 있는 컬럼만 읽습니다.
+    """
+    path = report_path(customer_id, report_tp, stat_dt)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl: return None
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns)
+    except Exception:
+        return None
+
+def _write_parquet(df, path):
+    # 임시 파일에 쓴 뒤 교체하므로 읽는 쪽이 깨진 파일을 보지 않음
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        out = df.copy(deep=False)
+        out.columns = [str(c) for c in out.columns]
+        out.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+        return False
+
+def save_report(df, customer_id, report_tp, stat_dt):
+    """리포트를 Parquet로 저장합니다."""
+    if not _write_parquet(df, report_path(customer_id, report_tp, stat_dt)): return False
+    evict_reports()
+    return True
+
+def list_reports(customer_id=None, report_tp=None):
+    """저장된 리포트 목록 (최신 날짜 순)"""
+    items = []
+    if not os.path.isdir(STORE_DIR): return items
+    for root, _, files in os.walk(STORE_DIR):
+        for name in files:
+            if not name.endswith(".parquet"): continue
+            path = os.path.join(root, name)
+            parts = os.path.relpath(root, STORE_DIR).split(os.sep)
+            if len(parts) != 2: continue    # 계정 폴더 바로 아래 파일(일별 키워드 표 등)은 리포트가 아님
+            cid, tp = parts
+            if customer_id is not None and cid != str(customer_id): continue
+            if report_tp is not None and tp != report_tp: continue
+            try: stat = os.stat(path)
+            except OSError: continue
+            items.append({"customer_id": cid, "report_tp": tp, "stat_dt": name[:-len(".parquet")],
+                          "path": path, "size": stat.st_size, "mtime": stat.st_mtime})
+    items.sort(key=lambda x: (x["stat_dt"], x["customer_id"]), reverse=True)
+    return items
+
+def stored_dates(customer_id, report_tp="AD"):
+    """계정별로 저장되어 있는 statDt 집합"""
+    return {item["stat_dt"] for item in list_reports(customer_id, report_tp)}
+
+def evict_reports(ttl=REPORT_TTL_SECONDS, max_bytes=STORE_MAX_BYTES):
+    """만료된 리포트를 지우고, 용량 한도를 넘으면 가장 오래 전에 저장된 것부터 지웁니다."""
+    with _evict_lock:
+        now = time.time()
+        alive = []
+        for item in list_reports():
+            if now - item["mtime"] > ttl:
+                try: os.remove(item["path"])
+                except OSError: pass
+            else:
+                alive.append(item)
+
+        total = sum(item["size"] for item in alive)
+        for item in sorted(alive, key=lambda x: x["mtime"]):
+            if total <= max_bytes: break
+            try: os.remove(item["path"])
+            except OSError: continue
+            total -= item["size"]
+
+# --------------------------------------------------------------------------
+# [Keyword History] 계정별 일별 키워드 표 (기간 추세 분석용, trends.py에서 갱신)
+# 경로: report_store/{고객ID}/keyword_daily.parquet / 일별 리포트에서 다시 만들 수 있는 파생 데이터
+# --------------------------------------------------------------------------
+def history_path(customer_id):
+    return os.path.join(STORE_DIR, str(customer_id), "keyword_daily.parquet")
+
+def load_keyword_history(customer_id):
+    try:
+        return pd.read_parquet(history_path(customer_id))
+    except Exception:
+        return None
+
+def save_keyword_history(df, customer_id):
+    return _write_parquet(df, history_path(customer_id))
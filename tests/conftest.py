@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import jobs
+import naver_api
+import report_store
+from mock_naver import MockNaverServer
+
+STAT_DT = "2024-01-02"
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """리포트 저장소/설정 파일/API 클라이언트 상태를 테스트마다 분리"""
+    monkeypatch.setattr(report_store, "STORE_DIR", str(tmp_path / "report_store"))
+    monkeypatch.setattr(config, "CONFIG_FILE", str(tmp_path / "config.json"))
+    monkeypatch.setattr(naver_api, "_clients", {})
+    monkeypatch.setattr(naver_api, "_report_jobs", {})
+    return tmp_path
+
+@pytest.fixture
+def mock(store, monkeypatch):
+    with MockNaverServer(rows=500, build_delay=0.3) as server:
+        monkeypatch.setattr(naver_api, "NAVER_API_BASE", server.url)
+        yield server
+
+@pytest.fixture
+def job_queue(store, monkeypatch):
+    """빈 작업 DB와 새 스레드 풀 (테스트가 끝나면 남은 작업이 끝날 때까지 대기)"""
+    monkeypatch.setattr(jobs, "JOB_DB", str(store / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "_executor", None)
+    monkeypatch.setattr(jobs, "_executor_size", 0)
+    jobs.init_job_db()
+    yield jobs
+    if jobs._executor is not None: jobs._executor.shutdown(wait=True)
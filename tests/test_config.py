@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+import config
+
+def test_stale_lock_is_replaced(store):
+    lock_path = f"{config.CONFIG_FILE}.lock"
+    with open(lock_path, "w") as f: f.write("999999")
+    old = time.time() - config.LOCK_STALE_SECONDS - 5
+    os.utime(lock_path, (old, old))
+
+    with config.config_lock(timeout=1):
+        with open(lock_path) as f: assert f.read() == str(os.getpid())
+    assert not os.path.exists(lock_path)
+    assert not [name for name in os.listdir(store) if name.endswith(".stale")]
+
+def test_fresh_lock_is_kept(store):
+    lock_path = f"{config.CONFIG_FILE}.lock"
+    with open(lock_path, "w") as f: f.write("999999")
+    assert config._remove_stale_lock(lock_path) is False
+    with pytest.raises(Exception, match="잠금 대기 시간 초과"):
+        with config.config_lock(timeout=0.2): pass
+    assert os.path.exists(lock_path)
+
+def test_lock_replaced_while_removing_is_restored(store, monkeypatch):
+    lock_path = f"{config.CONFIG_FILE}.lock"
+    with open(lock_path, "w") as f: f.write("999999")
+    old = time.time() - config.LOCK_STALE_SECONDS - 5
+    os.utime(lock_path, (old, old))
+
+    # 오래된 잠금을 확인한 직후 다른 프로세스가 지우고 새 잠금을 잡은 경우
+    rename = os.rename
+    def racing_rename(src, dst):
+        os.remove(src)
+        with open(src, "w") as f: f.write("12345")
+        rename(src, dst)
+    monkeypatch.setattr(config.os, "rename", racing_rename)
+    assert config._remove_stale_lock(lock_path)
+    monkeypatch.setattr(config.os, "rename", rename)
+
+    with open(lock_path) as f: assert f.read() == "12345"
+    assert not [name for name in os.listdir(store) if name.endswith(".stale")]
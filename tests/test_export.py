@@ -0,0 +1,21 @@
+import io
+
+import openpyxl
+import pandas as pd
+
+import utils
+from utils import export_frames
+
+def test_xlsx_continues_on_extra_sheets(monkeypatch):
+    monkeypatch.setattr(utils, "XLSX_MAX_DATA_ROWS", 4)
+    df = pd.DataFrame({"키워드ID": [f"k{i}" for i in range(10)], "광고비(원)": range(10)})
+    book = openpyxl.load_workbook(io.BytesIO(export_frames({"Report": df, "Other": df.head(2)}, "xlsx")), read_only=True)
+    assert book.sheetnames == ["Report", "Report_2", "Report_3", "Other"]
+    rows = [r for name in ["Report", "Report_2", "Report_3"] for r in list(book[name].iter_rows(values_only=True))[1:]]
+    assert [r[1] for r in rows] == list(range(10))
+    assert next(book["Report_3"].iter_rows(values_only=True)) == ("키워드ID", "광고비(원)")
+
+def test_xlsx_empty_frame_keeps_header():
+    book = openpyxl.load_workbook(io.BytesIO(export_frames({"Report": pd.DataFrame({"a": []})}, "xlsx")), read_only=True)
+    assert book.sheetnames == ["Report"]
+    assert list(book["Report"].iter_rows(values_only=True)) == [("a",)]
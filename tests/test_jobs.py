@@ -0,0 +1,140 @@
+import json
+import time
+
+import config
+import report_store
+from conftest import STAT_DT
+
+def wait_job(jobs, job_id, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get_job(job_id)
+        if job["status"] not in jobs.ACTIVE_STATUS: return job
+        time.sleep(0.05)
+    raise AssertionError(f"작업 {job_id}이(가) {timeout}초 안에 끝나지 않았습니다: {job}")
+
+def insert_running_job(jobs, params, heartbeat, kind="naver_report", owner="other-host:1"):
+    with jobs._connect() as conn:
+        return conn.execute(
+            "INSERT INTO jobs (kind, label, params, status, progress, created_at, started_at, owner, heartbeat) VALUES (?, 'main', ?, 'running', '실행 중', ?, ?, ?, ?)",
+            (kind, json.dumps(params), heartbeat, heartbeat, owner, heartbeat),
+        ).lastrowid
+
+def test_report_job_done(mock, job_queue):
+    account = mock.add_account()
+    config.upsert_account("main", account)
+
+    job_id = job_queue.submit_job("naver_report", {"alias": "main", "stat_dt": STAT_DT}, label="main")
+    assert job_queue.get_job(job_id)["status"] in job_queue.ACTIVE_STATUS
+    job = wait_job(job_queue, job_id)
+
+    assert job["status"] == "done", job["error"]
+    assert job["result"] == {"customer_id": account["id"], "report_tp": "AD", "stat_dt": STAT_DT, "rows": mock.rows}
+    assert job["params"]["report_jobs"].keys() == {STAT_DT}
+    assert len(report_store.load_report(account["id"], "AD", STAT_DT)) == mock.rows
+
+def test_report_job_failed(mock, job_queue):
+    mock.fail_dates.add(STAT_DT)
+    config.upsert_account("main", mock.add_account())
+
+    job = wait_job(job_queue, job_queue.submit_job("naver_report", {"alias": "main", "stat_dt": STAT_DT}))
+    assert job["status"] == "failed"
+    assert "상태: ERROR" in job["error"]
+
+def test_unknown_account_fails(mock, job_queue):
+    job = wait_job(job_queue, job_queue.submit_job("naver_report", {"alias": "nobody", "stat_dt": STAT_DT}))
+    assert job["status"] == "failed"
+    assert "등록되지 않은 계정" in job["error"]
+
+def test_backfill_job_saves_each_day(mock, job_queue):
+    account = mock.add_account()
+    config.upsert_account("main", account)
+
+    job = wait_job(job_queue, job_queue.submit_job("naver_backfill", {"alias": "main", "start": "2024-01-01", "end": "2024-01-03"}))
+    assert job["status"] == "done", job["error"]
+    assert job["result"]["saved"] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert report_store.stored_dates(account["id"], "AD") == {"2024-01-01", "2024-01-02", "2024-01-03"}
+
+def test_running_job_recovered_after_restart(mock, job_queue):
+    account = mock.add_account()
+    config.upsert_account("main", account)
+    # 이전 프로세스가 리포트 작업을 만든 뒤 'running' 상태로 죽은 경우 (heartbeat가 끊김)
+    report_job = mock.create_job(account["id"], "AD", STAT_DT)
+    params = {"alias": "main", "stat_dt": STAT_DT, "report_jobs": {STAT_DT: report_job["id"]}}
+    job_id = insert_running_job(job_queue, params, heartbeat=time.time() - 3600)
+
+    job = wait_job(job_queue, job_id)
+    assert job["status"] == "done", job["error"]
+    # 남겨 둔 reportJobId를 이어받았으므로 새 리포트 작업이 생기지 않음
+    assert mock.stats["reports_created"] == 1
+    assert job["params"]["report_jobs"] == {STAT_DT: report_job["id"]}
+
+def test_pool_grows_with_active_jobs(mock, job_queue):
+    config.upsert_account("main", mock.add_account())
+    ids = [job_queue.submit_job("naver_backfill", {"alias": "main", "start": day, "end": day})
+           for day in ("2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05", "2024-01-06")]
+    assert job_queue._executor_size >= len(ids)
+    assert all(wait_job(job_queue, i)["status"] == "done" for i in ids)
+
+def test_refresh_downloads_stored_report_again(mock, job_queue):
+    config.upsert_account("main", mock.add_account())
+    params = {"alias": "main", "stat_dt": STAT_DT}
+    assert wait_job(job_queue, job_queue.submit_job("naver_report", params))["status"] == "done"
+    assert wait_job(job_queue, job_queue.submit_job("naver_report", params))["status"] == "done"
+    assert mock.stats["reports_created"] == 1
+
+    assert wait_job(job_queue, job_queue.submit_job("naver_report", {**params, "refresh": True}))["status"] == "done"
+    assert mock.stats["reports_created"] == 2
+
+    job = wait_job(job_queue, job_queue.submit_job("naver_backfill", {"alias": "main", "start": STAT_DT, "end": STAT_DT, "refresh": True}))
+    assert job["result"]["saved"] == [STAT_DT]
+    assert mock.stats["reports_created"] == 3
+
+def test_backfill_stores_empty_days_and_reports_errors(mock, job_queue):
+    account = mock.add_account()
+    config.upsert_account("main", account)
+    mock.empty_dates.add("2024-01-02")
+    mock.fail_dates.add("2024-01-03")
+    params = {"alias": "main", "start": "2024-01-01", "end": "2024-01-03"}
+
+    job = wait_job(job_queue, job_queue.submit_job("naver_backfill", params))
+    assert job["status"] == "done", job["error"]
+    assert job["result"]["saved"] == ["2024-01-01", "2024-01-02"]
+    assert "상태: ERROR" in job["result"]["errors"]["2024-01-03"]
+    assert "2024-01-03" in job["progress"]
+    # 데이터 없는 날은 빈 리포트로 저장되어 다음 백필에서 다시 요청하지 않음
+    assert report_store.load_report(account["id"], "AD", "2024-01-02").empty
+
+    created = mock.stats["reports_created"]
+    job = wait_job(job_queue, job_queue.submit_job("naver_backfill", params))
+    assert job["result"]["saved"] == [] and list(job["result"]["errors"]) == ["2024-01-03"]
+    assert mock.stats["reports_created"] == created + 1
+
+def test_job_running_elsewhere_is_not_recovered(mock, job_queue):
+    config.upsert_account("main", mock.add_account())
+    live = insert_running_job(job_queue, {"alias": "main", "stat_dt": STAT_DT}, heartbeat=time.time())
+    stale = insert_running_job(job_queue, {"alias": "main", "stat_dt": "2024-01-03"}, heartbeat=time.time() - 3600)
+
+    assert wait_job(job_queue, stale)["status"] == "done"
+    # heartbeat가 살아 있는 작업은 다른 프로세스가 실행 중이므로 건드리지 않음
+    assert job_queue.get_job(live)["status"] == "running"
+    assert mock.stats["reports_created"] == 1
+
+def test_job_is_claimed_once(job_queue):
+    import threading
+    calls = []
+
+    @job_queue.job_handler("test_count")
+    def count(params, progress):
+        calls.append(params)
+        time.sleep(0.2)
+        return len(calls)
+
+    with job_queue._connect() as conn:
+        job_id = conn.execute("INSERT INTO jobs (kind, label, params, status, created_at) VALUES ('test_count', '', '{}', 'queued', ?)",
+                              (time.time(),)).lastrowid
+    workers = [threading.Thread(target=job_queue._run_job, args=(job_id,)) for _ in range(4)]
+    for w in workers: w.start()
+    for w in workers: w.join()
+    assert len(calls) == 1
+    assert job_queue.get_job(job_id)["status"] == "done"
@@ -0,0 +1,65 @@
+import pytest
+
+import naver_api
+from conftest import STAT_DT
+from mock_naver import MockNaverServer
+
+def test_download_report_end_to_end(mock):
+    account = mock.add_account()
+    df, stat_dt = naver_api.download_naver_report(account, stat_dt=STAT_DT)
+    assert stat_dt == STAT_DT and len(df) == mock.rows
+    assert {'날짜', '키워드ID', '광고비(원)', '노출수'} <= set(df.columns)
+    assert mock.stats["bad_signature"] == 0
+
+    # 두 번째 호출은 저장소에서 읽음 (API 호출 없음)
+    requests_before = mock.stats["requests"]
+    cached, _ = naver_api.download_naver_report(account, stat_dt=STAT_DT)
+    assert len(cached) == len(df) and mock.stats["requests"] == requests_before
+
+def test_bad_signature_is_rejected(mock):
+    account = {**mock.add_account(), "secret": "wrong"}
+    with pytest.raises(Exception, match="리포트 생성 실패"):
+        naver_api.download_naver_report(account, stat_dt=STAT_DT)
+    assert mock.stats["bad_signature"] == 1
+
+def test_create_retries_throttled_post_without_duplicates(store):
+    with MockNaverServer(rows=100, build_delay=0.1, rate=1.0, burst=1) as mock:
+        client = naver_api.NaverClient(mock.add_account(), base_url=mock.url, min_interval=0)
+        first = naver_api.create_report_job(client, ("x", "AD", "2024-01-01"))
+        second = naver_api.create_report_job(client, ("x", "AD", "2024-01-02"))
+        assert first != second
+        assert mock.stats["throttled"] >= 1
+        assert mock.stats["reports_created"] == 2
+
+def test_wait_keeps_polling_while_throttled(store):
+    with MockNaverServer(rows=100, build_delay=0.5, rate=1.0, burst=1) as mock:
+        # 재시도 없이 429를 그대로 받는 클라이언트: 상태 조회가 막혀도 작업 실패로 보지 않아야 함
+        client = naver_api.NaverClient(mock.add_account(), base_url=mock.url, max_retries=0, min_interval=0)
+        jid = naver_api.create_report_job(client, (client.account["id"], "AD", STAT_DT))
+        url = naver_api.wait_for_report(client, jid, deadline=10, first_interval=0.1, max_interval=0.5)
+        assert f"jobId={jid}" in url
+        assert mock.stats["throttled"] >= 1
+
+def test_resume_after_wait_deadline(store):
+    with MockNaverServer(rows=100, build_delay=1.0) as mock:
+        client = naver_api.NaverClient(mock.add_account(), base_url=mock.url, min_interval=0)
+        job_key = (client.account["id"], "AD", STAT_DT)
+        jid = naver_api.create_report_job(client, job_key)
+        with pytest.raises(Exception, match=f"jobId: {jid}"):
+            naver_api.wait_for_report(client, jid, deadline=0.2, first_interval=0.1)
+
+        # 다시 요청하면 새 작업을 만들지 않고 기존 작업을 이어서 기다림
+        assert naver_api.create_report_job(client, job_key) == jid
+        assert naver_api.wait_for_report(client, jid, deadline=10, first_interval=0.1)
+        assert mock.stats["reports_created"] == 1
+
+def test_failed_remembered_job_is_replaced(store):
+    with MockNaverServer(rows=100, build_delay=0, fail_dates={STAT_DT}) as mock:
+        client = naver_api.NaverClient(mock.add_account(), base_url=mock.url, min_interval=0)
+        job_key = (client.account["id"], "AD", STAT_DT)
+        jid = naver_api.create_report_job(client, job_key)
+        with pytest.raises(Exception, match="상태: ERROR"):
+            naver_api.wait_for_report(client, jid, deadline=5, first_interval=0.1)
+
+        assert naver_api.create_report_job(client, job_key) != jid
+        assert mock.stats["reports_created"] == 2
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from mock_naver import make_report_table
+from trends import DATE_COL, daily_keyword_frame, keyword_trends, update_keyword_history
+
+def build_history(days, keywords=1500, start="2024-01-01"):
+    history = None
+    for i, day in enumerate(pd.date_range(start, periods=days).strftime("%Y-%m-%d")):
+        report = make_report_table(keywords * 2, day, seed=i, keywords=keywords)
+        history = update_keyword_history(history, daily_keyword_frame(report, day))
+    return history
+
+def test_history_shorter_than_longest_window():
+    # 30일 창보다 짧은 이력 + 키워드 128개 이상 (category 코드가 int16인 경우)
+    history = build_history(20)
+    trends = keyword_trends(history)
+    assert len(trends) == history['키워드ID'].nunique()
+    assert trends['광고비_30일'].sum() == history['cost'].sum()
+    assert trends['키워드명'].notna().all() and trends['마지막날짜'].notna().all()
+
+    as_of = pd.Timestamp("2024-01-10")
+    in_week = history[(history[DATE_COL] > as_of - pd.Timedelta(days=7)) & (history[DATE_COL] <= as_of)]
+    assert keyword_trends(history, as_of=as_of)['광고비_7일'].sum() == in_week['cost'].sum()
+
+def test_pruned_days_do_not_leak_into_window_sums(monkeypatch):
+    import trends
+    monkeypatch.setattr(trends, "HISTORY_KEEP_DAYS", 10)
+    rows = [("old", "2024-01-01", 5000), ("old", "2024-01-20", 100), ("busy", "2024-01-01", 700)]
+    rows += [("busy", day, 10) for day in pd.date_range("2024-01-10", "2024-01-20").strftime("%Y-%m-%d")]
+    history = None
+    for day in sorted({d for _, d, _ in rows}):
+        daily = pd.DataFrame([{"키워드ID": k, "날짜": d, "광고비(원)": c, "전환매출액(원)": 0, "노출수": 1, "클릭수": 0}
+                              for k, d, c in rows if d == day])
+        history = update_keyword_history(history, daily_keyword_frame(daily))
+
+    assert history[DATE_COL].min() > pd.Timestamp("2024-01-01")
+    trends_df = keyword_trends(history, windows=(7,)).set_index('키워드ID')
+    # 'old'는 잘라낸 날(1/1)과 창 시작점 사이에 행이 없음 → 창 합계는 1/20 하루치만
+    assert trends_df.loc["old", "광고비_7일"] == 100
+    assert trends_df.loc["busy", "광고비_7일"] == 70
+    assert (history.groupby("키워드ID", observed=True)["cum_cost"].last() == history.groupby("키워드ID", observed=True)["cost"].sum()).all()
+
+def test_sync_picks_up_refreshed_report(store):
+    import os, time
+    import report_store
+    from trends import sync_keyword_history
+    for i, day in enumerate(["2024-01-01", "2024-01-02", "2024-01-03"]):
+        report_store.save_report(make_report_table(200, day, seed=i, customer_id="7"), "7", "AD", day)
+    before = sync_keyword_history("7")
+
+    # 가운데 날짜를 다시 받은 경우 (늦게 집계된 전환 반영)
+    refreshed = make_report_table(200, "2024-01-02", seed=99, customer_id="7")
+    time.sleep(0.01)
+    report_store.save_report(refreshed, "7", "AD", "2024-01-02")
+    after = sync_keyword_history("7")
+
+    day = after[after[DATE_COL] == "2024-01-02"]
+    assert day['cost'].sum() == refreshed['광고비(원)'].sum() != before[before[DATE_COL] == "2024-01-02"]['cost'].sum()
+    assert (after.groupby("키워드ID", observed=True)["cum_cost"].last() == after.groupby("키워드ID", observed=True)["cost"].sum()).all()
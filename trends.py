@@ -0,0 +1,180 @@
+import os
+import threading
+import pandas as pd
+
+from perf import timed
+from utils import concat_frames
+from report_store import load_report, list_reports, stored_dates, history_path, load_keyword_history, save_keyword_history
+from zombie_rules import BASE_METRICS, DERIVED_METRICS
+
+# --------------------------------------------------------------------------
+# [Trends] 기간 추세 분석 (저장된 일별 리포트 → 키워드별 최근 N일 집계)
+# 계정마다 (키워드ID, 날짜) 순으로 정렬된 일별 키워드 표를 보관합니다.
+# 각 행에는 그날 값과 키워드별 누적합(cum_*)이 있어서
+#   최근 N일 합계 = 기준일 누적합 - (기준일 - N일) 누적합
+# 으로 바로 구하고, 새 날짜는 키워드별 마지막 누적합에 더해 이어붙이기만 합니다.
+# --------------------------------------------------------------------------
+TREND_WINDOWS = (7, 14, 30)
+HISTORY_KEEP_DAYS = 400     # 이보다 오래된 날은 표에서 제외 (잘라낸 날의 누적합은 키워드별로 빼서 기준을 다시 맞춤)
+
+KEY_COL, DATE_COL, NAME_COL, CAMPAIGN_COL = '키워드ID', '날짜', '키워드명', '캠페인ID'
+KEY_COLUMNS = (KEY_COL, NAME_COL, CAMPAIGN_COL)     # category로 보관하는 컬럼
+REPORT_COLUMNS = {
+    KEY_COL: ['키워드ID', 'nccKeywordId'],
+    DATE_COL: ['날짜', 'statDt'],
+    NAME_COL: ['키워드명', 'keyword'],
+    CAMPAIGN_COL: ['캠페인ID', 'nccCampaignId'],
+    'cost': ['광고비(원)', 'salesAmt'],
+    'sales': ['전환매출액(원)', 'convAmt'],
+    'imp': ['노출수', 'impCnt'],
+    'clk': ['클릭수', 'clkCnt'],
+}
+DAY_METRICS = (*BASE_METRICS, 'spend_days')
+CUM_COLS = [f"cum_{m}" for m in DAY_METRICS]
+
+_history_lock = threading.Lock()
+
+def _pick(df, names):
+    return next((c for c in names if c in df.columns), None)
+
+def daily_keyword_frame(df, stat_dt=None):
+    """
+    리포트 한 장을 (키워드ID, 날짜) 단위 합계로 줄입니다. (매체/지역/순위별 행을 합침)
+    날짜 컬럼이 없으면 stat_dt를 씁니다.
+    """
+    cols = {k: _pick(df, names) for k, names in REPORT_COLUMNS.items()}
+    missing = [k for k in (KEY_COL, *BASE_METRICS) if cols[k] is None]
+    if missing: raise ValueError(f"추세 분석에 필요한 컬럼이 없습니다: {missing}")
+
+    out = pd.DataFrame({KEY_COL: df[cols[KEY_COL]].astype(str)})
+    if cols[DATE_COL] is not None:
+        out[DATE_COL] = pd.to_datetime(df[cols[DATE_COL]].astype(str), format='mixed')
+    else:
+        out[DATE_COL] = pd.Timestamp(stat_dt)
+    for m in BASE_METRICS:
+        out[m] = pd.to_numeric(df[cols[m]], errors='coerce').fillna(0).astype('int64')
+
+    daily = out.groupby([KEY_COL, DATE_COL], sort=False, observed=True)[list(BASE_METRICS)].sum()
+    daily['spend_days'] = (daily['cost'] > 0).astype('int64')
+    daily = daily.reset_index()
+    for c in (NAME_COL, CAMPAIGN_COL):
+        if cols[c] is not None:
+            first = df[cols[c]].astype(str).groupby(out[KEY_COL].to_numpy(), sort=False).first()
+            daily[c] = daily[KEY_COL].map(first)
+    return daily
+
+def _categorize(frame):
+    for c in KEY_COLUMNS:
+        if c in frame.columns: frame[c] = frame[c].astype('category')
+    return frame
+
+def _with_cumsum(frame):
+    # 전체 재계산: (키워드ID, 날짜) 정렬 후 키워드별 누적합 한 번
+    frame = frame.sort_values([KEY_COL, DATE_COL], kind='mergesort', ignore_index=True)
+    frame[CUM_COLS] = frame.groupby(KEY_COL, sort=False, observed=True)[list(DAY_METRICS)].cumsum().to_numpy()
+    return frame
+
+def update_keyword_history(history, daily):
+    """
+    일별 키워드 표(history)에 새 날짜(daily)를 반영합니다.
+    새 날짜가 모두 기존 마지막 날 이후면 키워드별 마지막 누적합에 이어서 더하고,
+    과거 날짜가 끼어들면(백필) 전체 누적합을 다시 계산합니다.
+    """
+    if history is None or history.empty:
+        return _prune(_categorize(_with_cumsum(daily)))
+    daily = daily[~daily[DATE_COL].isin(history[DATE_COL].unique())]
+    if daily.empty: return history
+
+    if daily[DATE_COL].min() > history[DATE_COL].max():
+        daily = daily.sort_values([KEY_COL, DATE_COL], kind='mergesort', ignore_index=True)
+        last = history.groupby(KEY_COL, sort=False, observed=True)[CUM_COLS].last()
+        offset = last.reindex(daily[KEY_COL]).fillna(0).to_numpy(dtype='int64')
+        daily[CUM_COLS] = daily.groupby(KEY_COL, sort=False)[list(DAY_METRICS)].cumsum().to_numpy() + offset
+        merged = concat_frames([history, daily], KEY_COLUMNS).sort_values([KEY_COL, DATE_COL], kind='mergesort', ignore_index=True)
+    else:
+        merged = _with_cumsum(concat_frames([history.drop(columns=CUM_COLS), daily], KEY_COLUMNS))
+
+    return _prune(_categorize(merged))
+
+def _prune(history):
+    """
+    보관 기간이 지난 날을 잘라내고, 키워드별로 잘라낸 마지막 행의 누적합을 남은 행에서 뺍니다.
+    (그대로 두면 창 시작점에 행이 없는 키워드는 시작값 0으로 계산되어 잘라낸 날의 값까지 합산됨)
+    """
+    old = (history[DATE_COL] <= history[DATE_COL].max() - pd.Timedelta(days=HISTORY_KEEP_DAYS)).to_numpy()
+    if not old.any(): return history
+    codes = history[KEY_COL].cat.codes.to_numpy()
+    baseline = history[old].groupby(codes[old], sort=False)[CUM_COLS].last()
+    kept = history[~old].reset_index(drop=True)
+    kept[CUM_COLS] = kept[CUM_COLS].to_numpy() - baseline.reindex(codes[~old]).fillna(0).to_numpy(dtype='int64')
+    return kept
+
+def sync_keyword_history(customer_id, report_tp="AD"):
+    """저장소에 있는 일별 리포트 중 아직 표에 없는 날짜만 읽어 반영하고, 갱신된 표를 반환합니다."""
+    with _history_lock, timed("trend.sync", account=customer_id) as m:
+        history = load_keyword_history(customer_id)
+        have = set() if history is None else set(history[DATE_COL].drop_duplicates().dt.strftime("%Y-%m-%d"))
+        new_days = sorted(stored_dates(customer_id, report_tp) - have)
+        refreshed = []
+        if history is not None:
+            # 표를 만든 뒤 다시 받은(새로고침) 날짜는 기존 행을 빼고 새로 반영
+            built_at = os.path.getmtime(history_path(customer_id))
+            refreshed = sorted(r['stat_dt'] for r in list_reports(customer_id, report_tp) if r['stat_dt'] in have and r['mtime'] > built_at)
+            if refreshed:
+                history = history[~history[DATE_COL].isin(pd.to_datetime(refreshed))].reset_index(drop=True)
+                new_days = sorted(set(new_days) | set(refreshed))
+        if history is not None and not history.empty:
+            # 보관 기간이 지나 잘라낸 날은 다시 읽지 않음
+            cutoff = (history[DATE_COL].max() - pd.Timedelta(days=HISTORY_KEEP_DAYS)).strftime("%Y-%m-%d")
+            new_days = [d for d in new_days if d > cutoff]
+        frames = []
+        for day in new_days:
+            df = load_report(customer_id, report_tp, day)
+            if df is not None and not df.empty: frames.append(daily_keyword_frame(df, day))    # 빈 리포트(데이터 없는 날)는 건너뜀
+        m["days"] = len(frames)
+        if frames:
+            history = update_keyword_history(history, concat_frames(frames, KEY_COLUMNS))
+        if frames or refreshed:
+            save_keyword_history(history, customer_id)
+        m["rows"] = 0 if history is None else len(history)
+        return history
+
+def _as_of(history, day):
+    # 키워드별로 day 이전(포함) 마지막 행의 누적합 (정렬돼 있으므로 groupby.last)
+    # 결과가 비거나 일부 키워드만 있으면 category 코드 타입이 달라 reindex가 실패하므로 문자열 인덱스로 반환
+    rows = history[history[DATE_COL] <= day]
+    last = rows.groupby(KEY_COL, sort=False, observed=True)[CUM_COLS].last()
+    last.index = last.index.astype(str)
+    return last
+
+def keyword_trends(history, as_of=None, windows=TREND_WINDOWS):
+    """
+    키워드별 최근 N일 광고비/매출/노출/클릭/CTR/ROAS/지출일수를 계산합니다.
+    as_of를 주지 않으면 표의 마지막 날짜를 기준일로 합니다.
+    """
+    if history is None or history.empty: return pd.DataFrame()
+    as_of = pd.Timestamp(as_of) if as_of is not None else history[DATE_COL].max()
+    with timed("trend.windows", rows=len(history)):
+        end = _as_of(history, as_of)
+        latest = history[history[DATE_COL] <= as_of].groupby(KEY_COL, sort=False, observed=True)[DATE_COL].last()
+        result = pd.DataFrame(index=end.index)
+        for c in (NAME_COL, CAMPAIGN_COL):
+            if c in history.columns:
+                result[c] = history.groupby(KEY_COL, sort=False, observed=True)[c].last().reindex(end.index).astype(str)
+        result['마지막날짜'] = latest.dt.strftime("%Y-%m-%d")
+
+        for n in sorted(windows):
+            start = _as_of(history, as_of - pd.Timedelta(days=n)).reindex(end.index).fillna(0)
+            sums = {m: (end[f"cum_{m}"] - start[f"cum_{m}"]).to_numpy(dtype='int64') for m in DAY_METRICS}
+            result[f"광고비_{n}일"] = sums['cost']
+            result[f"매출_{n}일"] = sums['sales']
+            result[f"노출_{n}일"] = sums['imp']
+            result[f"클릭_{n}일"] = sums['clk']
+            result[f"CTR_{n}일"] = DERIVED_METRICS['ctr'](sums).round(2)
+            result[f"ROAS_{n}일"] = DERIVED_METRICS['roas'](sums).round(1)
+            result[f"지출일수_{n}일"] = sums['spend_days']
+
+        longest = max(windows)
+        result = result[result[f"노출_{longest}일"] + result[f"광고비_{longest}일"] > 0]
+        result.index = result.index.astype(str)
+        return result.sort_values(f"광고비_{longest}일", ascending=False).reset_index()
@@ -1,32 +1,325 @@
+import re
+import csv
+import codecs
+import hashlib
+import tempfile
 import pandas as pd
-from io import StringIO
+from pandas.api.types import union_categoricals
+from io import StringIO, BytesIO
 import datetime
 import streamlit as st
+from zombie_rules import evaluate_rules
+from perf import timed, timed_fn
+
+LOG_MAX_LINES = 200
 
 def log_event(msg):
     ts = datetime.datetime.now().strftime('%H:%M:%S')
-    if 'logs' in st.session_state: st.session_state.logs.append(f"[{ts}] {msg}")
+    if 'logs' in st.session_state:
+        st.session_state.logs.append(f"[{ts}] {msg}")
+        del st.session_state.logs[:-LOG_MAX_LINES]
+
+# --------------------------------------------------------------------------
+# [Context] 채팅 첨부 파일 요약 (필요한 만큼만 읽고 토큰 예산에 맞춤)
+# --------------------------------------------------------------------------
+FILE_CONTEXT_TOKEN_BUDGET = 3000
+PROFILE_SAMPLE_ROWS = 2000
+TEXT_EXTENSIONS = ['txt', 'py', 'json', 'md', 'log']
+
+def _count_lines(fp, chunk_size=1024 * 1024):
+    """파싱 없이 줄 수만 셉니다."""
+    fp.seek(0)
+    count, last = 0, b""
+    while chunk := fp.read(chunk_size):
+        count += chunk.count(b"\n")
+        last = chunk[-1:]
+    fp.seek(0)
+    return count + (1 if last and last != b"\n" else 0)
+
+def _sample_csv(fp, nrows):
+    encoding = sniff_text_encoding(fp.read(64 * 1024))
+    total_rows = max(_count_lines(fp) - 1, 0)
+    df = pd.read_csv(fp, encoding=encoding, nrows=nrows, encoding_errors='replace')
+    return df, total_rows
+
+def _sample_excel(fp, nrows):
+    """openpyxl read-only 모드로 앞쪽 nrows 행만 순회합니다."""
+    import openpyxl
+    wb = openpyxl.load_workbook(fp, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        rows = list(ws.iter_rows(max_row=nrows + 1, values_only=True))
+        total_rows = (ws.max_row - 1) if ws.max_row else None
+    finally:
+        wb.close()
+    if not rows: return pd.DataFrame(), 0
+    header = [str(c) if c is not None else f"Col_{i}" for i, c in enumerate(rows[0])]
+    return pd.DataFrame(rows[1:], columns=header), total_rows
+
+def profile_columns(df, top_n=3):
+    """컬럼별 요약: 타입, 결측률, 숫자면 최소/최대, 아니면 최빈값"""
+    lines = []
+    for col in df.columns:
+        s = df[col]
+        line = f"- {col} ({s.dtype}) 결측 {s.isna().mean() * 100:.0f}%"
+        if pd.api.types.is_numeric_dtype(s) and s.notna().any():
+            line += f", 최소 {s.min():,.6g} / 최대 {s.max():,.6g}"
+        elif s.notna().any():
+            top = s.astype(str).value_counts().head(top_n)
+            line += ", 주요값 " + ", ".join(f"{v[:30]}({n})" for v, n in top.items())
+        lines.append(line)
+    return lines
+
+def fit_to_budget(sections, budget_tokens):
+    """섹션을 순서대로 이어 붙이되 토큰 예산을 넘는 부분은 잘라냅니다."""
+    out, used = [], 0
+    for section in sections:
+        cost = estimate_tokens(section)
+        if used + cost <= budget_tokens:
+            out.append(section)
+            used += cost
+            continue
+        remaining_chars = (budget_tokens - used) * 2
+        if remaining_chars > 200: out.append(section[:remaining_chars] + "\n...(생략)")
+        break
+    return "\n".join(out)
 
-def read_uploaded_file(uploaded_file):
+@timed_fn("chat.context")
+def read_uploaded_file(uploaded_file, budget_tokens=FILE_CONTEXT_TOKEN_BUDGET):
+    """
+    채팅 첨부 파일을 AI에게 넘길 요약 문자열로 변환합니다.
+    - CSV/엑셀: 앞쪽 일부만 읽어 크기, 컬럼 프로파일, 상위 3행을 요약 (전체 파싱 없음)
+    - txt/py/json 등: 앞부분 텍스트를 예산만큼만 읽음
+    """
     try:
         ext = uploaded_file.name.split('.')[-1].lower()
-        if ext in ['xlsx', 'xls']: df = pd.read_excel(uploaded_file)
-        elif ext == 'csv':
-            try: df = pd.read_csv(uploaded_file, encoding='utf-8')
-            except: uploaded_file.seek(0); df = pd.read_csv(uploaded_file, encoding='cp949')
+        uploaded_file.seek(0)
+
+        if ext in TEXT_EXTENSIONS:
+            raw = uploaded_file.read(budget_tokens * 2 * 4)
+            text = raw.decode(sniff_text_encoding(raw), errors='replace')
+            size = getattr(uploaded_file, 'size', None)
+            header = f"[텍스트 파일] 크기: {size:,} bytes" if size else "[텍스트 파일]"
+            return fit_to_budget([header, text], budget_tokens)
+
+        if ext in ['xlsx', 'xlsm']: df, total_rows = _sample_excel(uploaded_file, PROFILE_SAMPLE_ROWS)
+        elif ext == 'xls': df, total_rows = pd.read_excel(uploaded_file, nrows=PROFILE_SAMPLE_ROWS), None
+        elif ext == 'csv': df, total_rows = _sample_csv(uploaded_file, PROFILE_SAMPLE_ROWS)
         else: return f"변환 불가: {uploaded_file.name}"
-        return f"[데이터 요약]\n크기: {df.shape}\n상위 3행:\n{df.head(3).to_string()}"
+
+        total = f"{total_rows:,}" if total_rows is not None else "알 수 없음"
+        sampled = f" (앞 {len(df):,}행 기준 프로파일)" if total_rows is None or total_rows > len(df) else ""
+        sections = [
+            f"[데이터 요약]\n크기: {total}행 x {df.shape[1]}열{sampled}",
+            "컬럼 프로파일:\n" + "\n".join(profile_columns(df)),
+            f"상위 3행:\n{df.head(3).to_string()}",
+        ]
+        return fit_to_budget(sections, budget_tokens)
     except Exception as e: return f"[읽기 오류] {e}"
 
+def file_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+@st.cache_data(max_entries=8, show_spinner="파일 읽는 중...")
+def parse_uploaded_report(file_hash, name, _data):
+    """
+    분석용 업로드 파일 파싱. 파일 내용 해시(file_hash)로 캐시되어 같은 파일은 다시 읽지 않습니다.
+    (_data는 해시 계산에서 제외됩니다) / 반환: (df, kind, first_row)
+    """
+    with timed("upload.parse", bytes=len(_data)) as m:
+        df, kind, first_row = read_report_bytes(_data, name)
+        m["rows"] = len(df)
+    return df, kind, first_row
+
+# --------------------------------------------------------------------------
+# [Schema] 리포트 스키마 판정 (파일 앞부분만 보고 결정한 뒤 한 번만 파싱)
+# --------------------------------------------------------------------------
+# 이 단어들이 첫 행에 하나라도 포함되어 있다면, 이미 헤더가 있는 파일임.
+HEADER_KEYWORDS = ['비용', 'Cost', '광고비', '매출', 'Sales', '노출', 'Imp', '클릭', 'Click', '소재', '키워드']
+SCHEMA_14 = ['날짜', '고객ID', '캠페인ID', '광고그룹ID', '키워드ID', '키워드명', '매체', '지역', '순위', '노출수', '클릭수', '광고비(원)', '전환수', '전환매출액(원)']
+SCHEMA_12 = ['날짜', '캠페인ID', '광고그룹ID', '키워드ID', '키워드명', '매체', '노출수', '클릭수', '클릭률', '평균클릭비용', '광고비(원)', '전환매출액(원)']
+
+# 리포트 컬럼별 파싱 타입 (ID/매체는 category, 횟수/금액은 int64 → 이후 coerce_numeric이 범위를 보고 축소)
+REPORT_DTYPES = {
+    **{c: 'category' for c in ['고객ID', '캠페인ID', '광고그룹ID', '키워드ID', '매체', '지역',
+                               'customerId', 'nccCampaignId', 'nccAdgroupId', 'nccKeywordId', 'mediaCode', 'pcMblTp']},
+    **{c: 'int64' for c in ['노출수', '클릭수', '전환수', 'impCnt', 'clkCnt', 'ccnt',
+                            '광고비(원)', '전환매출액(원)', 'salesAmt', 'convAmt']},
+}
+
+def detect_report_schema(first_row):
+    """
+    첫 행만 보고 헤더 여부를 판정합니다.
+    반환: (names, kind) / 헤더가 있으면 names=None, kind='header'
+          헤더가 없으면 names=표준 스키마, kind='schema_14' | 'schema_12' | 'reverse'
+    """
+    cells = [str(c).strip() for c in first_row]
+    has_header = any(k.lower() in c.lower() for c in cells for k in HEADER_KEYWORDS)
+    # 날짜(숫자)로 시작하는지 체크 (헤더가 아니라 데이터일 확률 높음)
+    is_data_row = bool(cells) and cells[0].startswith('20') and cells[0].isdigit()
+
+    col_count = len(cells)
+    if (has_header and not is_data_row) or col_count < 5:
+        return None, "header"
+    if col_count == 14: return SCHEMA_14, "schema_14"
+    if col_count == 12: return SCHEMA_12, "schema_12"
+
+    # 열 개수가 애매하면 '스마트 역순 매핑' (성과지표는 무조건 뒤에 있음)
+    cols = [f"Col_{i}" for i in range(col_count)]
+    cols[-1] = '전환매출액(원)'
+    cols[-3] = '광고비(원)'
+    cols[-4] = '클릭수'
+    cols[-5] = '노출수'
+    cols[0] = '날짜'
+    return cols, "reverse"
+
+def report_read_options(first_row):
+    """detect_report_schema 결과를 pandas read_* 인자로 변환합니다."""
+    names, kind = detect_report_schema(first_row)
+    columns = names or [str(c).strip() for c in first_row]
+    options = {"header": None, "names": names} if names else {"header": 0}
+    options["dtype"] = {c: REPORT_DTYPES[c] for c in columns if c in REPORT_DTYPES}
+    return options, kind
+
+def relaxed_read_options(options):
+    """숫자 타입 지정이 실패했을 때 쓰는 옵션 (category만 유지, 숫자 정제는 coerce_numeric이 담당)"""
+    return {**options, "dtype": {c: t for c, t in options["dtype"].items() if t == 'category'}}
+
+def sniff_text_encoding(data, sample_bytes=1024 * 1024):
+    """앞부분만 디코딩해 utf-8(BOM 포함) / cp949 중 하나를 고릅니다."""
+    if data.startswith(codecs.BOM_UTF8): return 'utf-8-sig'
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(data[:sample_bytes], final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp949'
+
+def read_report_bytes(data, name):
+    """
+    업로드된 CSV/엑셀 리포트를 스키마 판정 후 한 번만 파싱합니다.
+    반환: (df, kind, first_row)
+    """
+    if name.lower().endswith('csv'):
+        encoding = sniff_text_encoding(data)
+        first_line = data[:64 * 1024].decode(encoding, errors='ignore').splitlines()[:1]
+        first_row = next(csv.reader(first_line), [])
+        options, kind = report_read_options(first_row)
+        try:
+            df = pd.read_csv(BytesIO(data), encoding=encoding, thousands=',', **options)
+        except (ValueError, TypeError, OverflowError):
+            # 숫자 컬럼에 문자가 섞이거나 int64를 넘는 값이 있으면 숫자 타입 지정 없이 다시 파싱
+            df = pd.read_csv(BytesIO(data), encoding=encoding, **relaxed_read_options(options))
+    else:
+        head = pd.read_excel(BytesIO(data), header=None, nrows=1)
+        first_row = head.iloc[0].tolist() if len(head) else []
+        options, kind = report_read_options(first_row)
+        try:
+            df = pd.read_excel(BytesIO(data), **options)
+        except (ValueError, TypeError, OverflowError):
+            df = pd.read_excel(BytesIO(data), **relaxed_read_options(options))
+    return df, kind, first_row
+
+def remember_result(cache, key, value=None, max_entries=4):
+    """
+    OrderedDict 기반 LRU 캐시. value를 주면 저장하고, 없으면 조회합니다.
+    최근에 쓴 항목을 뒤로 옮기고 max_entries를 넘으면 가장 오래된 항목을 버립니다.
+    """
+    if value is None:
+        value = cache.get(key)
+        if value is not None: cache.move_to_end(key)
+        return value
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_entries: cache.popitem(last=False)
+    return value
+
 def get_system_prompt(role):
     return "당신은 AC팀의 일원이다. 주어진 역할에 충실하라."
 
-def analyze_zombie_products(df):
+CHAT_MODEL_NAME = 'gemini-2.0-flash-exp'
+CHAT_HISTORY_TOKEN_BUDGET = 6000
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_chat_model(api_key, role, model_name=CHAT_MODEL_NAME):
+    """API 키 + 역할별로 모델 객체를 한 번만 만들어 재사용합니다."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name, system_instruction=get_system_prompt(role))
+
+def estimate_tokens(text):
+    """대략적인 토큰 수 (한글 기준 약 2자당 1토큰, 여유 있게 계산)"""
+    return len(text) // 2 + 1
+
+def build_chat_history(messages, budget_tokens=CHAT_HISTORY_TOKEN_BUDGET):
+    """
+    최근 대화부터 거꾸로 담아 토큰 예산 안에 들어가는 만큼만 Gemini history 형식으로 반환합니다.
+    대화가 길어져도 프롬프트 크기는 예산을 넘지 않으며, 첫 메시지는 항상 사용자 메시지입니다.
+    """
+    window, used = [], 0
+    for message in reversed(messages):
+        cost = estimate_tokens(message["content"])
+        if used + cost > budget_tokens: break
+        used += cost
+        window.append({"role": "model" if message["role"] == "assistant" else "user", "parts": [message["content"]]})
+    window.reverse()
+    while window and window[0]["role"] != "user": window.pop(0)
+    return window
+
+INT64_SAFE_DIGITS = 18      # 부호 포함 18자 이하 정수 문자열은 int64를 넘지 않음
+
+def coerce_numeric(df, cols):
+    """
+    지표 컬럼을 숫자로 변환합니다. (업로드/API 경로 공용)
+    - 이미 숫자 타입이면 문자열 변환 없이 그대로 사용
+    - 문자열이면 쉼표/앞뒤 공백을 제거한 뒤 정수 → 실수 순으로 바로 파싱하고,
+      그래도 안 되는 값(문자, 중간 공백 등)이 있을 때만 느린 변환(errors='coerce')을 사용
+    - 빈 값은 0, 정수로 표현 가능한 컬럼은 가장 작은 정수 타입으로 축소
+    - int64 범위를 넘는 값은 실수로 변환 (astype('int64')는 넘친 값을 조용히 잘못된 정수로 바꿈)
     """
-    [v5.0 Final] 적응형 하이브리드 분석기
-    1. 파일에 이미 헤더가 있는지 확인합니다. (키워드 검색)
-    2. 있다면 -> 그 헤더를 존중하여 사용합니다.
-    3. 없다면 -> 네이버 표준 스키마를 강제 적용합니다.
+    for c in dict.fromkeys(cols):
+        s = df[c]
+        if not pd.api.types.is_numeric_dtype(s):
+            txt = s.astype(str).str.replace(',', '', regex=False).str.strip()
+            try:
+                if txt.str.len().max() <= INT64_SAFE_DIGITS:
+                    s = txt.astype('int64')
+                else:
+                    # 긴 값이 있으면 범위를 확인하며 파싱 (int64를 넘는 값이 있으면 실수로)
+                    s = pd.to_numeric(txt)
+                    if s.dtype != 'int64': s = s.astype('float64')
+            except (ValueError, TypeError, OverflowError):
+                try: s = txt.astype('float64')
+                except (ValueError, TypeError):
+                    s = pd.to_numeric(txt.str.replace(r'\s', '', regex=True), errors='coerce')
+        if s.hasnans: s = s.fillna(0)
+        if pd.api.types.is_float_dtype(s) and (s % 1 == 0).all() and (s.abs() < 2 ** 63).all():
+            s = s.astype('int64')
+        df[c] = pd.to_numeric(s, downcast='integer') if pd.api.types.is_integer_dtype(s) else s
+    return df
+
+def concat_frames(frames, category_cols=()):
+    """
+    DataFrame들을 이어붙이되 category 컬럼은 값 목록을 합쳐서 category로 유지합니다.
+    (그냥 concat하면 값 목록이 다른 category는 object 문자열로 풀림)
+    category_cols에 준 컬럼은 먼저 category로 바꿉니다.
+    """
+    frames = [f.copy(deep=False) for f in frames]
+    for c in category_cols:
+        for f in frames:
+            if c in f.columns and not isinstance(f[c].dtype, pd.CategoricalDtype): f[c] = f[c].astype('category')
+    if len(frames) == 1: return frames[0]
+    for c in frames[0].columns:
+        if all(c in f.columns and isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames):
+            categories = union_categoricals([f[c] for f in frames]).categories
+            for f in frames: f[c] = f[c].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+def analyze_zombie_products(df, rules=None):
+    """
+    [v6.0] 좀비 상품 분석기
+    1. 헤더/표준 스키마 판정은 파일을 읽을 때(read_report_bytes, parse_report_tsv) 이미 끝났다고 가정합니다.
+    2. 컬럼명에서 비용/매출/노출/클릭 컬럼을 찾아 숫자로 정제합니다.
+    3. 좀비 판정은 rules(config.json의 ZOMBIE_RULES, 없으면 기본 규칙)로 합니다.
     """
     
     # 1. 컬럼명 전처리 (공백 제거)
@@ -34,58 +327,7 @@ def analyze_zombie_products(df):
     current_cols = df.columns.tolist()
 
     # ---------------------------------------------------------
-    # [Step A] 기존 헤더 존재 여부 판단 (Header Sniffing)
-    # ---------------------------------------------------------
-    # 이 단어들이 컬럼명에 하나라도 포함되어 있다면, 이미 헤더가 있는 파일임.
-    header_keywords = ['비용', 'Cost', '광고비', '매출', 'Sales', '노출', 'Imp', '클릭', 'Click', '소재', '키워드']
-    
-    has_header = any(k.lower() in str(c).lower() for c in current_cols for k in header_keywords)
-    
-    # 날짜(숫자)로 시작하는지 체크 (헤더가 아니라 데이터일 확률 높음)
-    first_val = str(current_cols[0])
-    is_data_row = first_val.startswith('20') and first_val.isdigit()
-
-    # ---------------------------------------------------------
-    # [Step B] 상황별 대응
-    # ---------------------------------------------------------
-    if has_header and not is_data_row:
-        # [Case 1] 제목이 있는 정상 파일
-        st.info("💡 파일에 포함된 '기존 제목'을 그대로 사용합니다.")
-        
-    else:
-        # [Case 2] 제목이 없는 API 원본 파일 (숫자로 시작하거나 키워드 없음)
-        st.warning(f"🚨 제목줄이 감지되지 않았습니다. (첫 행: {first_val})\n👉 네이버 표준 양식을 적용합니다.")
-        
-        # 첫 줄을 데이터로 내리기
-        new_row = pd.DataFrame([current_cols], columns=current_cols)
-        df = pd.concat([new_row, df], ignore_index=True)
-        
-        # 표준 스키마 적용 (가장 흔한 14열/12열 대응)
-        col_count = len(df.columns)
-        
-        schema_14 = ['날짜', '고객ID', '캠페인ID', '광고그룹ID', '키워드ID', '키워드명', '매체', '지역', '순위', '노출수', '클릭수', '광고비(원)', '전환수', '전환매출액(원)']
-        schema_12 = ['날짜', '캠페인ID', '광고그룹ID', '키워드ID', '키워드명', '매체', '노출수', '클릭수', '클릭률', '평균클릭비용', '광고비(원)', '전환매출액(원)']
-
-        if col_count == 14:
-            df.columns = schema_14
-        elif col_count == 12:
-            df.columns = schema_12
-        else:
-            # 열 개수가 애매하면 '스마트 역순 매핑' (성과지표는 무조건 뒤에 있음)
-            st.info("⚠️ 열 개수가 표준과 달라, 핵심 지표를 뒤에서부터 매칭합니다.")
-            cols = [f"Col_{i}" for i in range(col_count)]
-            cols[-1] = '전환매출액(원)'
-            cols[-3] = '광고비(원)'
-            cols[-4] = '클릭수'
-            cols[-5] = '노출수'
-            cols[0] = '날짜'
-            df.columns = cols
-            
-    # 컬럼 목록 갱신
-    current_cols = df.columns.tolist()
-
-    # ---------------------------------------------------------
-    # [Step C] 유연한 컬럼 찾기 (Fuzzy Logic)
+    # [Step A] 유연한 컬럼 찾기 (Fuzzy Logic)
     # ---------------------------------------------------------
     def find_col(keywords):
         for col in current_cols:
@@ -99,7 +341,7 @@ def analyze_zombie_products(df):
     clk = find_col(['클릭', 'clk', 'click'])
 
     # ---------------------------------------------------------
-    # [Step D] 사용자에게 보고 (Visual Check)
+    # [Step B] 사용자에게 보고 (Visual Check)
     # ---------------------------------------------------------
     with st.expander("🔎 데이터 매핑 결과 확인 (여기를 클릭하세요)", expanded=True):
         if cost and sales and imp and clk:
@@ -110,19 +352,108 @@ def analyze_zombie_products(df):
             st.stop() # 더 이상 진행하지 않고 멈춤
 
     # ---------------------------------------------------------
-    # [Step E] 데이터 정제 및 필터링
+    # [Step C] 데이터 정제 및 필터링
     # ---------------------------------------------------------
-    for c in [cost, sales, imp, clk]:
-        df[c] = df[c].astype(str).str.replace(',', '').str.replace(' ', '')
-        df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
-
-    # 좀비 조건: (돈 썼는데 매출 0) OR (노출됐는데 클릭 0)
-    cond = ((df[cost] >= 5000) & (df[sales] == 0)) | \
-           ((df[imp] >= 100) & (df[clk] == 0))
-           
+    df = coerce_numeric(df, [cost, sales, imp, clk])
+
+    # 좀비 조건: config.json의 규칙을 한 번에 평가 (기본: 돈 썼는데 매출 0 / 노출됐는데 클릭 0)
+    labels = evaluate_rules(
+        df, {'cost': cost, 'sales': sales, 'imp': imp, 'clk': clk}, rules,
+        date_col=find_col(['날짜', 'statDt', '일자', 'date']),
+        key_col=find_col(['키워드ID', 'keywordId']),
+        campaign_col=find_col(['캠페인ID', 'campaignId']),
+    )
+    cond = labels.notna()
+
     zombies = df[cond].copy()
+    zombies['좀비사유'] = labels[cond]
     
     return zombies
 
 def generate_kill_list_filename():
-    return f"Kill_List_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx"
\ No newline at end of file
+    return f"Kill_List_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx"
+
+def make_sheet_name(name, used=()):
+    """엑셀 시트 이름 규칙(31자, 특수문자 금지)에 맞게 변환하고 중복을 피합니다."""
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(name)).strip("'") or "Sheet"
+    base = base[:31]
+    sheet, n = base, 1
+    while sheet in used:
+        n += 1
+        suffix = f"_{n}"
+        sheet = base[:31 - len(suffix)] + suffix
+    return sheet
+
+# --------------------------------------------------------------------------
+# [Export] 다운로드 파일 생성 (download_button의 data에 함수로 넘겨 클릭 시에만 생성)
+# --------------------------------------------------------------------------
+EXPORT_FORMATS = {
+    "xlsx": ("Excel (.xlsx)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV (.csv)", "text/csv"),
+    "parquet": ("Parquet (.parquet)", "application/octet-stream"),
+}
+EXPORT_CHUNK_ROWS = 50000
+XLSX_MAX_DATA_ROWS = 1048576 - 1     # 엑셀 시트 최대 행 수 - 제목줄
+
+def _xlsx_values(col):
+    """엑셀에 쓸 값 배열: 빈 값은 None(빈칸), 숫자가 아닌 컬럼은 문자열"""
+    values = col.to_numpy(dtype=object) if pd.api.types.is_numeric_dtype(col) else col.astype(str).to_numpy(dtype=object)
+    values[col.isna().to_numpy()] = None
+    return values
+
+def _write_xlsx_sheet(workbook, sheet_name, df):
+    """
+    constant_memory 모드는 행 순서대로만 쓸 수 있으므로 청크 단위로 행을 이어서 씁니다.
+    시트 행 수 한도를 넘는 df는 export_frames가 미리 나눠서 넘깁니다.
+    """
+    if len(df) > XLSX_MAX_DATA_ROWS: raise ValueError(f"엑셀 시트 한 장에는 {XLSX_MAX_DATA_ROWS:,}행까지만 쓸 수 있습니다.")
+    ws = workbook.add_worksheet(sheet_name)
+    ws.write_row(0, 0, [str(c) for c in df.columns])
+    row = 1
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+        columns = [_xlsx_values(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+        for values in zip(*columns):
+            # write_row는 실패해도 예외 없이 음수를 반환하므로 (한도 초과 등) 직접 확인
+            if ws.write_row(row, 0, values) < 0:
+                raise Exception(f"엑셀 시트 '{sheet_name}' {row + 1}행 쓰기 실패")
+            row += 1
+
+def export_frames(sheets, fmt="xlsx", sheet_col="sheet"):
+    """
+    {시트명: df}를 파일 bytes로 변환합니다. 임시 파일에 스트리밍으로 쓴 뒤 읽어옵니다.
+    - xlsx: xlsxwriter constant_memory 모드 (시트별로 한 행씩 기록, 메모리 사용량 일정)
+            시트 행 수 한도(1,048,576행)를 넘으면 이름_2, 이름_3 … 시트로 이어서 씁니다.
+    - csv/parquet: 시트가 여러 개면 sheet_col 컬럼을 붙여 하나로 합칩니다.
+    """
+    import xlsxwriter
+    with timed(f"export.{fmt}", rows=sum(len(df) for df in sheets.values())) as m, tempfile.TemporaryFile() as fp:
+        if fmt == "xlsx":
+            workbook = xlsxwriter.Workbook(fp, {'constant_memory': True, 'in_memory': False, 'strings_to_numbers': False})
+            used = set()
+            for name, df in sheets.items():
+                for start in range(0, max(len(df), 1), XLSX_MAX_DATA_ROWS):
+                    sheet = make_sheet_name(name, used)
+                    used.add(sheet)
+                    _write_xlsx_sheet(workbook, sheet, df.iloc[start:start + XLSX_MAX_DATA_ROWS])
+            workbook.close()
+        else:
+            if len(sheets) == 1:
+                df = next(iter(sheets.values()))
+            else:
+                df = pd.concat([d.assign(**{sheet_col: name}) for name, d in sheets.items()], ignore_index=True)
+            if fmt == "csv":
+                df.to_csv(fp, index=False, encoding='utf-8-sig')
+            elif fmt == "parquet":
+                out = df.copy(deep=False)
+                out.columns = [str(c) for c in out.columns]
+                out.to_parquet(fp, index=False)
+            else:
+                raise ValueError(f"지원하지 않는 형식: {fmt}")
+        fp.seek(0)
+        data = fp.read()
+        m["bytes"] = len(data)
+        return data
+
+def export_file_name(base_name, fmt):
+    return f"{base_name.rsplit('.', 1)[0]}.{fmt}"
\ No newline at end of file
@@ -0,0 +1,156 @@
+import operator
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------------------------------
+# [Rules] 좀비 판정 규칙 엔진
+# config.json의 "ZOMBIE_RULES"에 아래 형식으로 저장합니다. (위에 있는 규칙이 우선)
+# {
+#   "name": "저ROAS",                        # 결과에 표시될 사유
+#   "enabled": true,
+#   "window_days": 7,                        # 1보다 크면 최근 N일을 키워드별로 합산해 판정
+#   "when": {"cost": [">=", 30000], "roas": ["<", 100]},
+#   "overrides": {"<캠페인ID>": {"roas": ["<", 50]}, "<캠페인ID>": {"skip": true}}
+# }
+# 지표: cost, sales, imp, clk, ctr(%), cpc(원), roas(%)
+# --------------------------------------------------------------------------
+DEFAULT_ZOMBIE_RULES = [
+    {"name": "광고비 소진 무매출", "when": {"cost": [">=", 5000], "sales": ["==", 0]}},
+    {"name": "노출 무클릭", "when": {"imp": [">=", 100], "clk": ["==", 0]}},
+]
+
+OPS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt, "==": operator.eq, "!=": operator.ne}
+BASE_METRICS = ("cost", "sales", "imp", "clk")
+DERIVED_METRICS = {
+    "ctr": lambda m: _ratio(m["clk"], m["imp"]) * 100,
+    "cpc": lambda m: _ratio(m["cost"], m["clk"]),
+    "roas": lambda m: _ratio(m["sales"], m["cost"]) * 100,
+}
+
+def _ratio(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b > 0, a / np.where(b > 0, b, 1), np.nan)
+
+def validate_rules(rules):
+    """규칙 형식을 검사합니다. 문제가 있으면 ValueError를 발생시킵니다."""
+    if not isinstance(rules, list): raise ValueError("규칙은 리스트여야 합니다.")
+    known = set(BASE_METRICS) | set(DERIVED_METRICS)
+    for rule in rules:
+        if not isinstance(rule, dict): raise ValueError(f"규칙은 객체여야 합니다: {rule}")
+        if not rule.get("name") or not isinstance(rule["name"], str) or not isinstance(rule.get("when"), dict) or not rule["when"]:
+            raise ValueError(f"규칙에 name/when이 필요합니다: {rule}")
+        if not isinstance(rule.get("enabled", True), bool):
+            raise ValueError(f"enabled는 true/false여야 합니다: {rule['name']}")
+        window = rule.get("window_days", 1)
+        if isinstance(window, bool) or not isinstance(window, int) or window < 1:
+            raise ValueError(f"window_days는 1 이상의 정수여야 합니다: {rule['name']}")
+        overrides = rule.get("overrides", {})
+        if not isinstance(overrides, dict) or not all(isinstance(o, dict) for o in overrides.values()):
+            raise ValueError(f"overrides는 {{캠페인ID: 조건}} 형식이어야 합니다: {rule['name']}")
+        conds = [rule["when"]] + [o for o in overrides.values() if not o.get("skip")]
+        for cond in conds:
+            for metric, spec in cond.items():
+                if metric == "skip": continue
+                if metric not in known: raise ValueError(f"알 수 없는 지표: {metric}")
+                if not isinstance(spec, (list, tuple)) or len(spec) != 2:
+                    raise ValueError(f"조건은 [연산자, 값] 형식이어야 합니다: {metric}")
+                op, value = spec
+                if not isinstance(op, str) or op not in OPS: raise ValueError(f"알 수 없는 연산자: {op}")
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"비교 값은 숫자여야 합니다: {metric} {op} {value!r}")
+    names = [r["name"] for r in rules]
+    if len(set(names)) != len(names): raise ValueError("규칙 이름이 중복되었습니다.")
+    return rules
+
+def _conditions(cond):
+    return [(metric, tuple(spec)) for metric, spec in cond.items() if metric != "skip"]
+
+class _RuleContext:
+    """지표 배열과 비교 결과를 한 번만 계산해 모든 규칙이 공유하도록 캐시합니다."""
+    def __init__(self, df, cols, dates=None, keys=None):
+        self.n = len(df)
+        self.base = {m: df[cols[m]].to_numpy(dtype='float64') for m in BASE_METRICS}
+        self.dates, self.keys = dates, keys
+        self._codes = None
+        self._metrics = {}
+        self._masks = {}
+
+    def metrics(self, window):
+        window = window if (window > 1 and self.dates is not None and self.keys is not None) else 1
+        if window not in self._metrics:
+            self._metrics[window] = self.base if window == 1 else self._window_sums(window)
+        return self._metrics[window], window
+
+    def _window_sums(self, window):
+        # 최근 N일 구간을 키워드별로 합산 (지표당 bincount 한 번)
+        if self._codes is None:
+            self._codes, uniques = pd.factorize(self.keys)
+            self._n_keys = len(uniques)
+        # 날짜를 읽지 못한 행(합계 행, 빈 날짜 등)은 기준일 계산과 구간에서 제외
+        latest = pd.Series(self.dates).max()
+        if pd.isna(latest):
+            in_win = np.zeros(self.n, dtype=bool)
+        else:
+            in_win = (self.dates >= latest - np.timedelta64(window - 1, 'D')) & (self._codes >= 0)
+        codes = self._codes[in_win]
+        out = {}
+        for m, arr in self.base.items():
+            sums = np.bincount(codes, weights=arr[in_win], minlength=self._n_keys).astype('float64')
+            v = sums[np.where(self._codes >= 0, self._codes, 0)]
+            v[~in_win] = np.nan
+            out[m] = v
+        return out
+
+    def mask(self, window, metric, op, value):
+        metrics, window = self.metrics(window)
+        key = (window, metric, op, float(value))
+        if key not in self._masks:
+            if metric not in metrics: metrics[metric] = DERIVED_METRICS[metric](metrics)
+            with np.errstate(invalid='ignore'):
+                self._masks[key] = OPS[op](metrics[metric], float(value))
+        return self._masks[key]
+
+    def condition(self, window, cond):
+        out = np.ones(self.n, dtype=bool)
+        for metric, (op, value) in _conditions(cond):
+            out &= self.mask(window, metric, op, value)
+        return out
+
+def evaluate_rules(df, cols, rules=None, date_col=None, key_col=None, campaign_col=None):
+    """
+    모든 규칙을 한 번에 평가해 행마다 처음 일치한 규칙 이름을 돌려줍니다. (일치 없음: NaN)
+    cols: {'cost': 컬럼명, 'sales': ..., 'imp': ..., 'clk': ...} / 지표 컬럼은 숫자여야 합니다.
+    같은 (구간, 지표, 연산자, 값) 비교는 여러 규칙이 공유하므로 규칙 수만큼 데이터를 다시 훑지 않습니다.
+    """
+    rules = [r for r in validate_rules(DEFAULT_ZOMBIE_RULES if rules is None else rules) if r.get("enabled", True)]
+
+    # 날짜/캠페인은 고유값만 변환한 뒤 코드로 펼침 (행 단위 문자열 변환 없음)
+    dates = keys = None
+    if date_col and key_col and any(r.get("window_days", 1) > 1 for r in rules):
+        date_codes, date_uniques = pd.factorize(df[date_col])
+        parsed = pd.to_datetime(pd.Index(date_uniques).astype(str), errors='coerce').to_numpy()
+        dates = np.where(date_codes >= 0, parsed[np.maximum(date_codes, 0)], np.datetime64('NaT'))
+        keys = df[key_col]
+    campaigns = None
+    if campaign_col and any(r.get("overrides") for r in rules):
+        campaign_codes, campaign_uniques = pd.factorize(df[campaign_col])
+        campaigns = (campaign_codes, {str(v): i for i, v in enumerate(campaign_uniques)})
+
+    ctx = _RuleContext(df, cols, dates, keys)
+    masks = []
+    for rule in rules:
+        window = int(rule.get("window_days", 1))
+        matched = ctx.condition(window, rule["when"])
+        overrides = rule.get("overrides", {}) if campaigns is not None else {}
+        for campaign, cond in overrides.items():
+            code = campaigns[1].get(str(campaign))
+            if code is None: continue
+            in_campaign = campaigns[0] == code
+            override = np.zeros(ctx.n, dtype=bool) if cond.get("skip") else ctx.condition(window, {**rule["when"], **cond})
+            matched = np.where(in_campaign, override, matched)
+        masks.append(matched)
+
+    names = [r["name"] for r in rules]
+    if not masks: return pd.Series(pd.Categorical([None] * ctx.n, categories=names), index=df.index)
+    codes = np.select(masks, np.arange(len(masks)), default=-1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=names), index=df.index)